@@ -0,0 +1,87 @@
+"""Per-invocation overhead of decorators.regex_arguments.
+
+Compares the decorator with the version that compiled nothing up front, on the
+pattern of `match start` and a command that does nothing.
+
+Run from the root directory: python -m benchmarks.regex_arguments
+"""
+
+import asyncio
+import inspect
+import re
+import time
+
+from discord.ext import commands
+
+from src.utils import decorators
+
+CALLS = 20000
+RUNS = 5
+ARGS = "Week 3 Match 2 g2 fnc 3"
+
+
+def uncompiled_regex_arguments(pattern):
+    """regex_arguments before the pattern and converters were resolved once."""
+
+    def decorator(function):
+        async def wrapper(self, ctx, *, args: str):
+            match = re.match(pattern, args.strip())
+            if match is None:
+                raise commands.UserInputError()
+            arg_groups = [self, ctx] + list(match.groups())
+            arg_converted = []
+            signature = inspect.signature(function)
+            for parameter, argument in zip(signature.parameters.values(), arg_groups):
+                if parameter.annotation == inspect.Parameter.empty:
+                    arg_converted.append(argument)
+                elif isinstance(parameter.annotation, commands.Converter):
+                    arg_converted.append(
+                        await parameter.annotation.convert(ctx, argument),
+                    )
+                elif inspect.isclass(parameter.annotation) and issubclass(
+                    parameter.annotation,
+                    commands.Converter,
+                ):
+                    arg_converted.append(
+                        await parameter.annotation().convert(ctx, argument),
+                    )
+                elif callable(parameter.annotation):
+                    arg_converted.append(parameter.annotation(argument))
+                else:
+                    raise commands.UserInputError()
+            await function(*arg_converted)
+
+        return wrapper
+
+    return decorator
+
+
+async def match_start(
+    self, ctx, name: str, team1_code: str, team2_code: str, bestof: int
+):
+    pass
+
+
+async def benchmark(command) -> float:
+    """Return the best time per call in microseconds."""
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            await command(None, None, args=ARGS)
+        best = min(best, (time.perf_counter() - start) / CALLS)
+    return best * 1e6
+
+
+async def main():
+    uncompiled = uncompiled_regex_arguments("(.+) (\\S+) (\\S+) (\\S+)")(match_start)
+    compiled = decorators.regex_arguments(
+        r"(?P<name>.+) (?P<team1_code>\S+) (?P<team2_code>\S+) (?P<bestof>\d+)"
+    )(match_start)
+
+    for name, command in (("uncompiled", uncompiled), ("compiled", compiled)):
+        print(f"{name:>10}: {await benchmark(command):.2f} us/call")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,6 +5,7 @@ from tortoise.query_utils import Q
 
 from src import models
 from src.cogs.tournament import TournamentCog
+from src.managers.guildcache import guild_cache
 from src.utils import decorators
 
 
@@ -59,25 +60,34 @@ class TeamsCog(commands.Cog, name="Teams"):
         *,
         name: str,
     ):
-        try:
-            team = await models.Team.get(code=code, guild=ctx.guild.id)
-        except tortoise.exceptions.DoesNotExist:
+        team = await guild_cache.team(ctx.guild.id, code)
+        if team is None:
             raise TeamException(f"There is no team with code {code}")
 
         original_name = team.name
 
-        if name != team.name:
-            team.name = name
-            await team.save()
+        guild_cache.invalidate_teams(ctx.guild.id)
+        try:
+            if name != team.name:
+                team.name = name
+                await team.save()
+        finally:
+            # Drop teams that were cached again while saving
+            guild_cache.invalidate_teams(ctx.guild.id)
+
+        await ctx.send(f'Changed name:\n "{original_name}" => "{name}"')
 
         tr_cog: TournamentCog = self.bot.get_cog("Tournament")
         if tr_cog is not None:
-            # Update matches
+            # Update matches in the background
             to_update = await models.Match.filter(Q(team1=team) | Q(team2=team))
-            for match in to_update:
-                await tr_cog.tournament_manager.update_match_message(match)
-
-        await ctx.send(f'Changed name:\n "{original_name}" => "{name}"')
+            if to_update:
+                progress = await ctx.send(
+                    f"Updating match messages... (0/{len(to_update)})"
+                )
+                tr_cog.tournament_manager.start_job(
+                    tr_cog.tournament_manager.rerender_matches(to_update, progress)
+                )
 
     @edit_group.group(
         name="code",
@@ -94,11 +104,11 @@ class TeamsCog(commands.Cog, name="Teams"):
         old_code: str,
         new_code: str,
     ):
-        try:
-            team = await models.Team.get(code=old_code, guild=ctx.guild.id)
-        except tortoise.exceptions.DoesNotExist:
+        team = await guild_cache.team(ctx.guild.id, old_code)
+        if team is None:
             raise TeamException(f"There is no team with code {old_code}.")
 
+        guild_cache.invalidate_teams(ctx.guild.id)
         try:
             if new_code != team.code:
                 team.code = new_code
@@ -107,6 +117,9 @@ class TeamsCog(commands.Cog, name="Teams"):
             raise TeamException(
                 f"Could not update team {old_code}. (Maybe the code {new_code} is already in use?)",
             )
+        finally:
+            # Drop teams that were cached again while saving
+            guild_cache.invalidate_teams(ctx.guild.id)
 
         await ctx.send(f"Changed code:\n '{old_code}' => '{new_code}'.")
 
@@ -125,9 +138,8 @@ class TeamsCog(commands.Cog, name="Teams"):
         code: str,
         emoji: commands.converter.EmojiConverter,
     ):
-        try:
-            team = await models.Team.get(code=code, guild=ctx.guild.id)
-        except tortoise.exceptions.DoesNotExist:
+        team = await guild_cache.team(ctx.guild.id, code)
+        if team is None:
             raise TeamException(f"There is no team with code {code}.")
         running_matches = await models.Match.filter(
             Q(team1=team) | Q(team2=team),
@@ -146,7 +158,10 @@ class TeamsCog(commands.Cog, name="Teams"):
                 Q(team1=team) | Q(team2=team),
                 running=models.MatchRunningEnum.CLOSED,
             )
-            dialogs_opened = any(m in tr_cog.dialogs.values() for m in closed_matches)
+            match_index = tr_cog.tournament_manager.match_index
+            dialogs_opened = any(
+                match_index.has_dialog(m.message) for m in closed_matches
+            )
 
         if dialogs_opened:
             raise TeamException(
@@ -155,9 +170,14 @@ class TeamsCog(commands.Cog, name="Teams"):
 
         old_emoji = self.bot.get_emoji(team.emoji)
 
-        if emoji.id != team.emoji:
-            team.emoji = emoji.id
-            await team.save()
+        guild_cache.invalidate_teams(ctx.guild.id)
+        try:
+            if emoji.id != team.emoji:
+                team.emoji = emoji.id
+                await team.save()
+        finally:
+            # Drop teams that were cached again while saving
+            guild_cache.invalidate_teams(ctx.guild.id)
 
         await ctx.send(f"Changed emoji:\n {old_emoji} => {emoji}")
 
@@ -189,6 +209,7 @@ class TeamsCog(commands.Cog, name="Teams"):
             raise TeamException(
                 f"Could not create new team. (Maybe the code {code} is already in use?)",
             )
+        guild_cache.invalidate_teams(ctx.guild.id)
         await ctx.send(f"Added team `{code}`")
 
     @team_group.command(
@@ -201,11 +222,15 @@ class TeamsCog(commands.Cog, name="Teams"):
     @commands.guild_only()
     @commands.has_permissions(manage_messages=True)
     async def team_remove(self, ctx, code: str):
-        try:
-            team = await models.Team.get(code=code, guild=ctx.guild.id)
-        except tortoise.exceptions.DoesNotExist:
+        team = await guild_cache.team(ctx.guild.id, code)
+        if team is None:
             raise TeamException(f"There is no team with code {code}.")
-        await team.delete()
+        guild_cache.invalidate_teams(ctx.guild.id)
+        try:
+            await team.delete()
+        finally:
+            # Drop teams that were cached again while deleting
+            guild_cache.invalidate_teams(ctx.guild.id)
         await ctx.send(f"Deleted team {team.name}.")
 
     @team_group.command(
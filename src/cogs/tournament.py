@@ -2,23 +2,44 @@ import asyncio
 import logging
 import math
 import re
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from traceback import print_exc
 from typing import Optional
-from uuid import UUID
 
 import discord
-import tortoise
-import tortoise.exceptions
 from discord.channel import TextChannel
 from discord.ext import commands, tasks
+from tortoise.transactions import in_transaction
 
 from src import models
 from src.aiomediawiki.aiomediawiki import APIException, ServerException, leaguepedia
 from src.aiomediawiki.tables.teams import TeamsRow
+from src.managers import matchlist
+from src.managers.expiringset import ExpiringSet
+from src.managers.guildcache import guild_cache
+from src.managers.matchindex import OpenMatch
+from src.managers.matchlist import MatchList
+from src.managers.requestscheduler import Priority
+from src.managers.teamlogos import TeamLogos
 from src.managers.tournamentmanager import TournamentManager
 from src.utils import decorators
 
+TEAM_CREATION_CONCURRENCY = 2  # Team emojis created at the same time
+MATCH_LIST_LIMIT = 50  # Match list messages that can still be paged
+FANDOM_ERROR_TTL = 24 * 60 * 60  # Seconds until a sync problem is reported again
+
+# Match ids and ranges of them separated by spaces, e.g. "3 5-7"
+MATCH_IDS_PATTERN = r"(?P<ids>\d+(?:-\d+)?(?:\s+\d+(?:-\d+)?)*)$"
+
+
+def parse_match_ids(argument: str) -> list[int]:
+    ids = []
+    for id_string in argument.split():
+        start, _, stop = id_string.partition("-")
+        ids.extend(range(int(start), int(stop or start) + 1))
+    return ids
+
 
 # Exceptions
 class TournamentException(Exception):
@@ -38,27 +59,42 @@ class TournamentCog(commands.Cog, name="Tournament"):
         "bo5_team": 3,
         "bo5_games": 1,
     }
-    dialogs: dict[int, int] = {}  # (dialog message, match message)
-    fandommatch_errors: set[UUID] = set()
+    # Matches whose Fandom sync problem was reported recently
+    fandommatch_errors: ExpiringSet
 
     # http:// or https://
     link_validation_regex = re.compile(r"^(?:http)s?://", re.IGNORECASE)
     tournament_manager: TournamentManager
+    team_logos: TeamLogos
+    match_lists: OrderedDict[int, MatchList]  # {message id: match list}, oldest first
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.tournament_manager = TournamentManager(bot)
+        self.team_logos = TeamLogos()
+        self.match_lists = OrderedDict()
+        self.fandommatch_errors = ExpiringSet(FANDOM_ERROR_TTL)
         self.update_fandom_matches_task.add_exception_type(
             APIException, ServerException
         )
 
     def cog_unload(self):
         self.update_fandom_matches_task.stop()
+        self.tournament_manager.reaction_queue.cancel()
+        self.tournament_manager.tournament_messages.cancel()
+        self.tournament_manager.cancel_jobs()
+        self.tournament_manager.emoji_colours.close()
 
     @commands.Cog.listener()
     async def on_ready(self):
-        logging.debug("Starting Fandom task.")
-        self.update_fandom_matches_task.start()
+        # on_ready also fires after reconnecting
+        if not self.update_fandom_matches_task.is_running():
+            logging.debug("Starting Fandom task.")
+            self.update_fandom_matches_task.start()
+
+        # Reactions made while we were disconnected never arrive as events
+        logging.debug("Reconciling predictions of open matches.")
+        self.tournament_manager.start_job(self.tournament_manager.sync_open_matches())
 
     # ------------------------------ TASKS -----------------------------
 
@@ -82,7 +118,6 @@ class TournamentCog(commands.Cog, name="Tournament"):
             tournament.fandom_overview_page,
             fandom_tabs,
         )
-        any_ended: bool = False
         matchdays_to_close: set[str, int] = {
             (fandommatch.tab, fandommatch.matchday)
             for fandommatch in fandommatches
@@ -90,17 +125,16 @@ class TournamentCog(commands.Cog, name="Tournament"):
             < datetime.now(tz=timezone.utc)
         }
 
-        teams = await models.Team.filter(guild=tournament.guild).exclude(
-            fandom_overview_page=None
-        )
-        teams = {t.fandom_overview_page: t for t in teams}
+        teams = (await guild_cache.teams(tournament.guild)).by_page
 
         db_matches = await models.Match.filter(
             tournament=tournament, fandom_tab__in=fandom_tabs
-        ).select_related("team1", "team2")
+        )
+        await self.tournament_manager.load_match_relations(db_matches, tournament)
         db_matches = {
             (m.fandom_tab, m.fandom_initialn_matchintab): m for m in db_matches
         }
+        matches_to_close: list[models.Match] = []
         for fandommatch in fandommatches:
             # Check if match already exists
             if (
@@ -135,7 +169,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
                         and fandommatch.winner is None
                     ):
                         # Match should be closed, but is not over yet (no result)
-                        await self.tournament_manager.close_match(match)
+                        matches_to_close.append(match)
 
                     if fandommatch.winner is not None:
                         # Match is over (there is a result)
@@ -158,70 +192,155 @@ class TournamentCog(commands.Cog, name="Tournament"):
                                     message = f"There was a problem closing match {match.id_in_tournament}."
 
                                 if channel is not None:
-                                    channel.send(message)
+                                    await channel.send(message)
                                     self.fandommatch_errors.add(match.id)
 
                             continue
 
-                        any_ended = True
+                        # Report the match again if it has another problem later
+                        self.fandommatch_errors.discard(match.id)
+
+                        # The tournament message edits of all ended matches are coalesced
                         await self.tournament_manager.end_match(
                             match,
                             fandommatch.winner,
                             fandommatch.team1_score + fandommatch.team2_score,
-                            update_tournament_message=False,
                         )
-        if any_ended:
-            await self.tournament_manager.update_tournament_message(tournament)
+        await self.tournament_manager.close_matches(matches_to_close)
 
     # ----------------------------- UTILITY ----------------------------
 
     async def update_fandom_teams(
         self, tournament_overviewpage: str, guild_id: int
     ) -> bool:
+        """Make sure every team of a Leaguepedia tournament exists in the guild.
+
+        Teams are saved as soon as they're created, so after an error a retry only
+        creates the teams that are still missing. Returns true if there was an error.
+        """
         teams = await leaguepedia.get_teams(tournament_overviewpage)
         guild: discord.Guild = self.bot.get_guild(guild_id)
-        guild_teams = await models.Team.filter(guild=guild_id)
+        guild_teams = await guild_cache.teams(guild_id)
+        teams_by_code = guild_teams.by_code
+        teams_by_page = guild_teams.by_page
 
         teams_to_create: list[TeamsRow] = []
+        teams_to_adopt: list[models.Team] = []
 
         # Figure out which teams we need to add
         for team in teams:
-            t = discord.utils.get(guild_teams, code=team.short.lower())
+            if team.overviewPage in teams_by_page:
+                continue
+            t = teams_by_code.get(team.short.lower())
             if t is None:
                 teams_to_create.append(team)
             elif not t.is_fandom:
                 # Take control of teams with the correct name already
                 t.fandom_overview_page = team.overviewPage
-                await t.save()
+                teams_to_adopt.append(t)
 
-        error = False
+        if teams_to_adopt:
+            guild_cache.invalidate_teams(guild_id)
+            try:
+                async with in_transaction():
+                    for t in teams_to_adopt:
+                        await models.Team.filter(id=t.id).update(
+                            fandom_overview_page=t.fandom_overview_page
+                        )
+            finally:
+                guild_cache.invalidate_teams(guild_id)
+
+        # Emojis that may have been created by an earlier attempt without saving their team
+        used_emojis = {t.emoji for t in teams_by_code.values()}
+        unused_emojis = {e.name: e for e in guild.emojis if e.id not in used_emojis}
+
+        semaphore = asyncio.Semaphore(TEAM_CREATION_CONCURRENCY)
 
         # Return true if there was an error
         async def add_team(team: TeamsRow) -> bool:
-            # page_info = await leaguepedia.get_page_info(team.overviewPage, ["images"])
-            team_image = f"{team.overviewPage}logo square.png"
-            img = await leaguepedia.get_file(team_image, size=256)
-            try:
-                emoji: discord.Emoji = await guild.create_custom_emoji(
-                    name=team.short.lower(), image=img
-                )
-            except discord.errors.HTTPException:
-                return True
-
-            await models.Team.create(
-                name=team.name,
-                code=team.short.lower(),
-                emoji=emoji.id,
-                guild=guild_id,
-                fandom_overview_page=team.overviewPage,
-                bot_created=True,
-            )
+            code = team.short.lower()
+            async with semaphore:
+                try:
+                    emoji = unused_emojis.get(code)
+                    if emoji is not None:
+                        # Only reuse it if we created it, the creator is only known after a fetch
+                        emoji = await guild.fetch_emoji(emoji.id)
+                        if emoji.user != self.bot.user:
+                            emoji = None
+
+                    if emoji is None:
+                        # page_info = await leaguepedia.get_page_info(team.overviewPage, ["images"])
+                        img = await self.team_logos.get(team.overviewPage)
+                        if img is None:
+                            return True
+                        emoji = await guild.create_custom_emoji(name=code, image=img)
+
+                    await models.Team.create(
+                        name=team.name,
+                        code=code,
+                        emoji=emoji.id,
+                        guild=guild_id,
+                        fandom_overview_page=team.overviewPage,
+                        bot_created=True,
+                    )
+                    guild_cache.invalidate_teams(guild_id)
+                except Exception:
+                    logging.exception(f"Could not create team {team.overviewPage}")
+                    return True
 
             return False
 
         coro_list = [add_team(t) for t in teams_to_create]
         return any(await asyncio.gather(*coro_list))
 
+    async def remove_other_reactions(
+        self, match: OpenMatch, payload: discord.RawReactionActionEvent
+    ):
+        """Removes the user's other reactions in the same category, looking them up on the message."""
+        # Fetch the message with its current reactions
+        message = await self.tournament_manager.messages.fetch(
+            payload.channel_id, payload.message_id, Priority.INTERACTIVE
+        )
+
+        to_remove = set()
+        emoji: discord.PartialEmoji = payload.emoji
+
+        # Team
+        team_emoji = set(match.team_emojis)
+        if emoji.id in team_emoji:
+            team_emoji.remove(emoji.id)
+            to_remove.update({str(self.bot.get_emoji(e)) for e in team_emoji})
+
+        # Games
+        if match.bestof > 1:
+            games_emojis = set(match.games_emojis)
+            if str(emoji) in games_emojis:
+                games_emojis.remove(str(emoji))
+                to_remove.update(games_emojis)
+
+        async def reaction_get_users(reaction):
+            return (reaction, [u.id for u in await reaction.users().flatten()])
+
+        async def remove_reaction(reaction: discord.Reaction):
+            str_react = str(reaction)
+            if str_react not in to_remove:
+                return
+            await reaction.remove(discord.Object(payload.user_id))
+
+        coro_list = [
+            reaction_get_users(r)
+            for r in message.reactions
+            if str(r.emoji) in to_remove
+        ]
+        reaction_users = await asyncio.gather(*coro_list)
+
+        coro_list = [
+            remove_reaction(r)
+            for (r, u_id) in reaction_users
+            if payload.user_id in u_id
+        ]
+        await asyncio.gather(*coro_list)
+
     # ----------------------------- GROUPS -----------------------------
 
     @commands.group(
@@ -259,10 +378,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
     @commands.has_permissions(manage_messages=True)
     async def tournament_start(self, ctx: commands.Context, *, name_or_link: str):
         # Check if tournament already running
-        tournament = await models.Tournament.get_or_none(
-            channel=ctx.channel.id,
-            running=models.TournamentRunningEnum.RUNNING,
-        )
+        tournament = await guild_cache.running_tournament(ctx.channel.id)
         if tournament is not None:
             raise TournamentException(
                 f"There is already a running tournament in this channel: {tournament}. You can only have one running tournament per channel."
@@ -315,19 +431,10 @@ class TournamentCog(commands.Cog, name="Tournament"):
 
                 fandom_overview_page = fandom_tournament.overviewPage
 
-            # Check if tournament by this name already exists
-            # If yes, add a number behind it
-            base_name = tournament_name
-            i = 1
-            tournament = await models.Tournament.get_or_none(
-                name=tournament_name, guild=ctx.guild.id
+            # If a tournament by this name already exists, add a number behind it
+            tournament_name = await models.Tournament.unique_name(
+                tournament_name, ctx.guild.id
             )
-            while tournament:
-                tournament_name = base_name + f" ({i})"
-                i += 1
-                tournament = await models.Tournament.get_or_none(
-                    name=tournament_name, guild=ctx.guild.id
-                )
 
             tournament = await self.tournament_manager.start_tournament(
                 tournament_name,
@@ -352,10 +459,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
     @commands.has_permissions(manage_messages=True)
     async def tournament_end(self, ctx):
         # Check if tournament running
-        tournament = await models.Tournament.get_or_none(
-            channel=ctx.channel.id,
-            running=models.TournamentRunningEnum.RUNNING,
-        )
+        tournament = await guild_cache.running_tournament(ctx.channel.id)
         if tournament is None:
             raise TournamentException("There is no running tournament in this channel.")
 
@@ -379,7 +483,12 @@ class TournamentCog(commands.Cog, name="Tournament"):
                 f"Could not end tournament {tournament} (There are still closed matches.)"
             )
 
-        await self.tournament_manager.end_tournament(tournament)
+        try:
+            await self.tournament_manager.end_tournament(tournament)
+        except discord.HTTPException:
+            raise TournamentException(
+                f"Ended tournament {tournament.name}, but could not update the tournament message (Use tournament rebuildstandings to try again.)"
+            )
 
         await ctx.send(f"Tournament **{tournament.name}** ended.")
         await ctx.message.delete()
@@ -407,10 +516,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
             )
             txt = "There is no tournament with this name in this guild."
         else:
-            tournament = await models.Tournament.get_or_none(
-                channel=ctx.channel.id,
-                running=models.TournamentRunningEnum.RUNNING,
-            )
+            tournament = await guild_cache.running_tournament(ctx.channel.id)
             txt = "There is no running tournament in this channel."
 
         # Check if tournament exists
@@ -423,6 +529,123 @@ class TournamentCog(commands.Cog, name="Tournament"):
         )
         await ctx.send(content)
 
+    @tournament_group.command(
+        name="rebuildstandings",
+        brief="Recalculates the final standings of an ended tournament.",
+        description="Recalculates the final standings of an ended tournament in this server, e.g. after a correction.\n\nArguments:\n-Tournament name can contain spaces.",
+        usage="<tournament name>",
+    )
+    @commands.guild_only()
+    @commands.has_permissions(manage_messages=True)
+    async def tournament_rebuild_standings(self, ctx, *, name: str):
+        tournament = await models.Tournament.get_or_none(
+            name=name,
+            guild=ctx.guild.id,
+        )
+        if tournament is None:
+            raise TournamentException(
+                "Could not find tournament (There is no tournament with that name in this server.)"
+            )
+        if tournament.running != models.TournamentRunningEnum.ENDED:
+            raise TournamentException(
+                f"Could not rebuild standings of tournament {tournament.name} (The tournament has not ended yet.)"
+            )
+
+        async with ctx.typing():
+            await self.tournament_manager.freeze_leaderboards(tournament)
+            try:
+                await self.tournament_manager.update_tournament_message(tournament)
+            except discord.HTTPException:
+                raise TournamentException(
+                    f"Rebuilt the standings of tournament {tournament.name}, but could not update the tournament message."
+                )
+
+        await ctx.send(f"Rebuilt the standings of tournament **{tournament.name}**.")
+
+    @tournament_group.command(
+        name="rank",
+        brief="Shows a user's rank in the running tournament.",
+        description="Shows the rank of a user in the running tournament in this channel, together with the players right above and below them.\n\nArguments:\n-User is optional, if none is provided it shows your own rank.",
+        aliases=["r"],
+        usage="[@user]",
+    )
+    @commands.guild_only()
+    async def tournament_rank(self, ctx, member: Optional[discord.Member] = None):
+        tournament = await guild_cache.running_tournament(ctx.channel.id)
+        if tournament is None:
+            raise TournamentException("There is no running tournament in this channel.")
+
+        if member is None:
+            member = ctx.author
+
+        index = await self.tournament_manager.get_score_index(tournament)
+        rank = index.rank(member.id)
+        if rank is None:
+            raise TournamentException(
+                f"{member.display_name} does not have any scored predictions in {tournament.name}."
+            )
+
+        ranked = index.neighbours(member.id)
+        content = f"**{tournament.name} Rank - {member.display_name}: {rank}/{len(index)}**\n\n"
+        content += f"```c\n{self.tournament_manager.format_ranked_entries(ranked)}```"
+        await ctx.send(content)
+
+    @tournament_group.command(
+        name="guildleaderboard",
+        brief="Shows the leaderboard of all tournaments in this server.",
+        description="Shows the combined leaderboard of all tournaments in this server.\n\nArguments:\n-Start and end dates are optional and should be formatted as YYYY-MM-DD. Only matches that ended between them are counted.",
+        aliases=["glb"],
+        usage="[start date] [end date]",
+    )
+    @commands.guild_only()
+    async def guild_leaderboard(
+        self, ctx, start: Optional[str] = None, end: Optional[str] = None
+    ):
+        try:
+            start_date = datetime.strptime(start, "%Y-%m-%d").date() if start else None
+            end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else None
+        except ValueError:
+            raise TournamentException("Dates should be formatted as YYYY-MM-DD.")
+
+        pages = await self.tournament_manager.generate_guild_leaderboard_text(
+            ctx.guild, start_date, end_date
+        )
+        for page in pages:
+            await ctx.send(page)
+
+    @tournament_group.command(
+        name="rebuildguildleaderboard",
+        brief="Rebuilds the leaderboard of all tournaments in this server.",
+        description="Recalculates the combined leaderboard of all tournaments in this server from all ended matches.",
+        usage="",
+    )
+    @commands.guild_only()
+    @commands.is_owner()
+    async def guild_leaderboard_rebuild(self, ctx):
+        async with ctx.typing():
+            await self.tournament_manager.rebuild_guild_scores(ctx.guild.id)
+        await ctx.send("Rebuilt the server leaderboard.")
+
+    @tournament_group.command(
+        name="messagestats",
+        brief="Shows statistics on the Discord requests made in the background.",
+        description="Shows how many REST calls the message updates made and how many fetches they skipped, and the queue depth and wait times of the requests per priority.",
+        usage="",
+    )
+    @commands.is_owner()
+    async def message_stats(self, ctx):
+        messages = self.tournament_manager.messages
+        scheduler = self.tournament_manager.scheduler
+        lines = [
+            f"Message updates made {messages.rest_calls} REST calls and saved {messages.rest_calls_saved}."
+        ]
+        for priority, waits in scheduler.waits.items():
+            lines.append(
+                f"{priority.name.capitalize()}: {scheduler.depth(priority)} queued, "
+                f"{waits.count} made, waited {waits.average:.2f}s on average and {waits.max:.2f}s at most."
+            )
+        await ctx.send("\n".join(lines))
+
     @tournament_group.command(
         name="setupdates",
         brief="Sets this channel to display updates on the tournament (Who predicted correctly, etc.).",
@@ -445,6 +668,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
 
         tournament.updates_channel = ctx.channel.id
         await tournament.save()
+        guild_cache.invalidate_tournament(tournament.channel)
         await ctx.send(
             f"This channel will now display updates on the tournament {tournament.name}."
         )
@@ -491,10 +715,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
             )
             txt = "There is no tournament with this name in this guild."
         else:
-            tournament = await models.Tournament.get_or_none(
-                channel=ctx.channel.id,
-                running=models.TournamentRunningEnum.RUNNING,
-            )
+            tournament = await guild_cache.running_tournament(ctx.channel.id)
             txt = "There is no running tournament in this channel."
 
         # Check if tournament exists
@@ -521,7 +742,9 @@ class TournamentCog(commands.Cog, name="Tournament"):
     )
     @commands.guild_only()
     @commands.has_permissions(manage_messages=True)
-    @decorators.regex_arguments("(.+) (\\S+) (\\S+) (\\S+)")
+    @decorators.regex_arguments(
+        r"(?P<name>.+) (?P<team1_code>\S+) (?P<team2_code>\S+) (?P<bestof>\d+)"
+    )
     async def match_start(
         self,
         ctx,
@@ -531,10 +754,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
         bestof: int,
     ):
         # Check if tournament running
-        tournament = await models.Tournament.get_or_none(
-            channel=ctx.channel.id,
-            running=models.MatchRunningEnum.RUNNING,
-        )
+        tournament = await guild_cache.running_tournament(ctx.channel.id)
         if tournament is None:
             raise TournamentException("There is no running tournament in this channel.")
 
@@ -543,14 +763,12 @@ class TournamentCog(commands.Cog, name="Tournament"):
                 f"{bestof} is not a valid value for the 'best of' field."
             )
 
-        try:
-            team1 = await models.Team.get(code=team1_code, guild=ctx.guild.id)
-        except tortoise.exceptions.DoesNotExist:
+        team1 = await guild_cache.team(ctx.guild.id, team1_code)
+        if team1 is None:
             raise TournamentException(f"There is no team with code {team1_code}")
 
-        try:
-            team2 = await models.Team.get(code=team2_code, guild=ctx.guild.id)
-        except tortoise.exceptions.DoesNotExist:
+        team2 = await guild_cache.team(ctx.guild.id, team2_code)
+        if team2 is None:
             raise TournamentException(f"There is no team with code {team2_code}")
 
         await self.tournament_manager.start_match(
@@ -559,6 +777,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
             bestof,
             team1,
             team2,
+            priority=Priority.INTERACTIVE,
         )
 
         await ctx.message.delete()
@@ -572,35 +791,21 @@ class TournamentCog(commands.Cog, name="Tournament"):
     )
     @commands.guild_only()
     @commands.has_permissions(manage_messages=True)
-    async def match_close(self, ctx, *ids_string: str):
+    @decorators.regex_arguments(MATCH_IDS_PATTERN)
+    async def match_close(self, ctx, ids: parse_match_ids):
         # Validate input
         # Check if tournament running
-        tournament = await models.Tournament.get_or_none(
-            channel=ctx.channel.id,
-            running=models.MatchRunningEnum.RUNNING,
-        )
+        tournament = await guild_cache.running_tournament(ctx.channel.id)
         if tournament is None:
             raise TournamentException("There is no running tournament in this channel.")
 
-        ids = []
-        for id_string in ids_string:
-            if id_string.isdigit():
-                ids.append(int(id_string))
-            else:
-                s = id_string.split(sep="-")
-                if len(s) == 2 and s[0].isdigit() and s[1].isdigit():
-                    start = int(s[0])
-                    stop = int(s[1]) + 1
-                    ids.extend(list(range(start, stop)))
-
         matches = await models.Match.filter(
             tournament=tournament,
             id_in_tournament__in=ids,
             running=models.MatchRunningEnum.RUNNING,
         )
 
-        coro_list = [self.tournament_manager.close_match(match) for match in matches]
-        asyncio.gather(*coro_list)
+        await self.tournament_manager.close_matches(matches)
         await ctx.message.delete()
 
     @match_group.command(
@@ -612,27 +817,14 @@ class TournamentCog(commands.Cog, name="Tournament"):
     )
     @commands.guild_only()
     @commands.has_permissions(manage_messages=True)
-    async def match_end(self, ctx, *ids_string: str):
+    @decorators.regex_arguments(MATCH_IDS_PATTERN)
+    async def match_end(self, ctx, ids: parse_match_ids):
         # Validate input
         # Check if tournament running
-        tournament = await models.Tournament.get_or_none(
-            channel=ctx.channel.id,
-            running=models.MatchRunningEnum.RUNNING,
-        )
+        tournament = await guild_cache.running_tournament(ctx.channel.id)
         if tournament is None:
             raise TournamentException("There is no running tournament in this channel.")
 
-        ids = []
-        for id_string in ids_string:
-            if id_string.isdigit():
-                ids.append(int(id_string))
-            else:
-                s = id_string.split(sep="-")
-                if len(s) == 2 and s[0].isdigit() and s[1].isdigit():
-                    start = int(s[0])
-                    stop = int(s[1]) + 1
-                    ids.extend(list(range(start, stop)))
-
         # Also open the dialog for already ended matches in case the bot made a mistake
         matches = (
             await models.Match.filter(
@@ -643,17 +835,29 @@ class TournamentCog(commands.Cog, name="Tournament"):
             .select_related("team1", "team2")
         )
 
+        await self.tournament_manager.close_matches(
+            [m for m in matches if m.running == models.MatchRunningEnum.RUNNING]
+        )
+        match_index = self.tournament_manager.match_index
         for match in matches:
-            if match.running == models.MatchRunningEnum.RUNNING:
-                await self.tournament_manager.close_match(match)
-            if match.message not in self.dialogs.values():
+            # Replace dialogs that were deleted while we weren't looking
+            dialog = match_index.get_match_dialog(match.message)
+            if dialog is not None:
+                try:
+                    await self.tournament_manager.messages.fetch(
+                        ctx.channel.id, dialog, Priority.INTERACTIVE
+                    )
+                except discord.NotFound:
+                    await match_index.remove_dialog(dialog)
+
+            if not match_index.has_dialog(match.message):
                 txt = f'**Match End:** Which team won in match {match.id_in_tournament} "{match.name}"'
                 if match.bestof > 1:
                     txt += " and in how many games"
                 txt += "? Press ✅ after you're done to end the match."
                 message: discord.Message = await ctx.send(txt)
 
-                self.dialogs[message.id] = match.message
+                await match_index.add_dialog(message.id, match)
 
                 # Add Team reacts
                 await message.add_reaction(self.bot.get_emoji(match.team1.emoji))
@@ -673,16 +877,13 @@ class TournamentCog(commands.Cog, name="Tournament"):
     @match_group.command(
         name="fix",
         brief="Fix match.",
-        description="Fixes emotes on a match.",
+        description="Fixes emotes on a match. Predictions of an open match are read again from its reactions.",
         usage="<id>",
     )
     @commands.guild_only()
     @commands.is_owner()
     async def match_fix(self, ctx: commands.Context, *, id: int):
-        tournament = await models.Tournament.get_or_none(
-            channel=ctx.channel.id,
-            running=models.MatchRunningEnum.RUNNING,
-        )
+        tournament = await guild_cache.running_tournament(ctx.channel.id)
         if tournament is None:
             raise TournamentException("There is no running tournament in this channel.")
 
@@ -696,10 +897,16 @@ class TournamentCog(commands.Cog, name="Tournament"):
         )
         if match is None:
             raise TournamentException("This match does not exist")
+        await self.tournament_manager.load_match_relations([match], tournament)
 
         if match.running == models.MatchRunningEnum.RUNNING:
+            # Fix predictions, e.g. when reaction events were missed
+            await self.tournament_manager.resync_match(match)
+
             # Fix emoji
-            message: discord.Message = await ctx.channel.fetch_message(match.message)
+            message = await self.tournament_manager.messages.fetch(
+                ctx.channel.id, match.message, Priority.INTERACTIVE
+            )
 
             for reaction in message.reactions:
                 if reaction.me:
@@ -716,7 +923,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
                     await message.add_reaction(games_emojis[i])
 
         # Fix name
-        await self.tournament_manager.update_match_message(match)
+        await self.tournament_manager.update_match_message(match, Priority.INTERACTIVE)
 
     @match_group.command(
         name="list",
@@ -734,75 +941,55 @@ class TournamentCog(commands.Cog, name="Tournament"):
             )
             txt = "There is no tournament with this name in this guild."
         else:
-            tournament = await models.Tournament.get_or_none(
-                channel=ctx.channel.id,
-                running=models.TournamentRunningEnum.RUNNING,
-            )
+            tournament = await guild_cache.running_tournament(ctx.channel.id)
             txt = "There is no running tournament in this channel."
 
         # Check if tournament exists
         if tournament is None:
             raise TournamentException(txt)
 
-        past_matches = await models.Match.filter(
-            tournament=tournament,
-            running=models.MatchRunningEnum.ENDED,
-        ).prefetch_related("team1", "team2")
-        closed_matches = await models.Match.filter(
-            tournament=tournament,
-            running=models.MatchRunningEnum.CLOSED,
-        ).prefetch_related("team1", "team2")
-        active_matches = await models.Match.filter(
-            tournament=tournament,
-            running=models.MatchRunningEnum.RUNNING,
-        ).prefetch_related("team1", "team2")
+        match_list = MatchList(tournament)
+        await match_list.load(self.bot)
+        message = await ctx.send(match_list.content)
+        if match_list.next_start is None:
+            return
 
-        paginator = commands.Paginator(max_size=2000, prefix="", suffix="")
-        paginator.add_line(f"***{tournament.name} Matches***")
-
-        if past_matches:
-            paginator.add_line("")
-            paginator.add_line(f"**Ended Matches:**")
-            past_matches.sort(key=lambda x: x.id)
-            for match in past_matches:
-                team1: models.Team = match.team1
-                team2: models.Team = match.team2
-                team1_emoji = self.bot.get_emoji(team1.emoji)
-                team2_emoji = self.bot.get_emoji(team2.emoji)
-                if match.result == 1:
-                    match_content = f"{match.id_in_tournament}. {match.name}: **{team1_emoji} {team1.name}** vs {team2.name} {team2_emoji} - BO{match.bestof} - Result: {match.win_games}-{match.lose_games}"
-                elif match.result == 2:
-                    match_content = f"{match.id_in_tournament}. {match.name}: {team1_emoji} {team1.name} vs **{team2.name} {team2_emoji}** - BO{match.bestof} - Result: {match.lose_games}-{match.win_games}"
-                paginator.add_line(match_content)
-
-        if closed_matches:
-            paginator.add_line("")
-            paginator.add_line(f"**Closed Matches:**")
-            closed_matches.sort(key=lambda x: x.id)
-            for match in closed_matches:
-                team1: models.Team = match.team1
-                team2: models.Team = match.team2
-                team1_emoji = self.bot.get_emoji(team1.emoji)
-                team2_emoji = self.bot.get_emoji(team2.emoji)
-                match_content = f"{match.id_in_tournament}. {match.name}: {team1_emoji} {team1.name} vs {team2.name} {team2_emoji} - BO{match.bestof}"
-                paginator.add_line(match_content)
-        if active_matches:
-            paginator.add_line("")
-            paginator.add_line(f"**Open Matches:**")
-            active_matches.sort(key=lambda x: x.id)
-            for match in active_matches:
-                team1: models.Team = match.team1
-                team2: models.Team = match.team2
-                team1_emoji = self.bot.get_emoji(team1.emoji)
-                team2_emoji = self.bot.get_emoji(team2.emoji)
-                match_content = f"{match.id_in_tournament}. {match.name}: {team1_emoji} {team1.name} vs {team2.name} {team2_emoji} - BO{match.bestof}"
-                paginator.add_line(match_content)
-
-        if not (past_matches or closed_matches or active_matches):
-            paginator.add_line("There are no matches in this tournament.")
+        self.match_lists[message.id] = match_list
+        while len(self.match_lists) > MATCH_LIST_LIMIT:
+            self.match_lists.popitem(last=False)
+        await message.add_reaction(matchlist.PREVIOUS_EMOJI)
+        await message.add_reaction(matchlist.NEXT_EMOJI)
 
-        for page in paginator.pages:
-            await ctx.send(page)
+    async def turn_match_list_page(
+        self, match_list: MatchList, payload: discord.RawReactionActionEvent
+    ):
+        emoji = str(payload.emoji)
+        if emoji == matchlist.NEXT_EMOJI:
+            turned = await match_list.next(self.bot)
+        elif emoji == matchlist.PREVIOUS_EMOJI:
+            turned = await match_list.previous(self.bot)
+        else:
+            return
+
+        messages = self.tournament_manager.messages
+        try:
+            if turned:
+                await messages.edit(
+                    payload.channel_id,
+                    payload.message_id,
+                    Priority.INTERACTIVE,
+                    content=match_list.content,
+                )
+            partial = messages.partial(payload.channel_id, payload.message_id)
+            await messages.request(
+                payload.channel_id,
+                lambda: partial.remove_reaction(
+                    payload.emoji, discord.Object(payload.user_id)
+                ),
+                Priority.INTERACTIVE,
+            )
+        except discord.HTTPException:
+            pass
 
     # ----------------------------- EVENTS -----------------------------
 
@@ -814,64 +1001,37 @@ class TournamentCog(commands.Cog, name="Tournament"):
         if payload.user_id == self.bot.user.id:
             return False
 
-        # Check if message is a match or in dialogs
-        match = (
-            await models.Match.filter(message=payload.message_id)
-            .select_related("team1", "team2")
-            .first()
-        )
-        if match is not None and match.running == models.MatchRunningEnum.RUNNING:
-            # Fetch channel and message
-            channel = self.bot.get_channel(payload.channel_id)
-            message: discord.Message = await channel.fetch_message(payload.message_id)
-
-            to_remove = set()
-            emoji: discord.PartialEmoji = payload.emoji
-
-            # Team
-            team_emoji = {match.team1.emoji, match.team2.emoji}
-            if emoji.id in team_emoji:
-                team_emoji.remove(emoji.id)
-                to_remove.update({str(self.bot.get_emoji(e)) for e in team_emoji})
-
-            # Games
-            if match.bestof > 1:
-                games_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"][
-                    math.floor(match.bestof / 2) : match.bestof
-                ]
-                games_emojis = set(games_emojis)
-                if str(emoji) in games_emojis:
-                    games_emojis.remove(str(emoji))
-                    to_remove.update(games_emojis)
-
-            async def reaction_get_users(reaction):
-                return (reaction, [u.id for u in await reaction.users().flatten()])
+        # Check if message is a paged match list
+        match_list = self.match_lists.get(payload.message_id)
+        if match_list is not None:
+            await self.turn_match_list_page(match_list, payload)
+            return
+
+        # Check if message is an open match
+        match = await self.tournament_manager.get_open_match(payload.message_id)
+        if match is not None:
+            if match.tracked:
+                # We know the user's reactions, handle the event in a batch
+                self.tournament_manager.reaction_queue.put(payload)
+            else:
+                # Record the prediction
+                team, games = match.parse_emoji(payload.emoji)
+                if (team is not None or games is not None) and not payload.member.bot:
+                    await self.tournament_manager.record_prediction(
+                        match.match_id, payload.member, team=team, games=games
+                    )
 
-            async def remove_reaction(reaction: discord.Reaction):
-                str_react = str(reaction)
-                if str_react not in to_remove:
-                    return
-                await reaction.remove(discord.Object(payload.user_id))
-
-            coro_list = [
-                reaction_get_users(r)
-                for r in message.reactions
-                if str(r.emoji) in to_remove
-            ]
-            reaction_users = await asyncio.gather(*coro_list)
-
-            coro_list = [
-                remove_reaction(r)
-                for (r, u_id) in reaction_users
-                if payload.user_id in u_id
-            ]
-            await asyncio.gather(*coro_list)
+                await self.remove_other_reactions(match, payload)
 
         # Check if message is a dialog message
-        if (payload.message_id in self.dialogs.keys()) and (str(payload.emoji) == "✅"):
+        match_index = self.tournament_manager.match_index
+        dialog_match_message = match_index.get_dialog(payload.message_id)
+        if (dialog_match_message is not None) and (str(payload.emoji) == "✅"):
             # Fetch channel and message
             channel: discord.abc.Messageable = self.bot.get_channel(payload.channel_id)
-            message: discord.Message = await channel.fetch_message(payload.message_id)
+            message = await self.tournament_manager.messages.fetch(
+                payload.channel_id, payload.message_id, Priority.INTERACTIVE
+            )
 
             # Check if user has manage messages permission
             perms = payload.member.permissions_in(channel)
@@ -885,7 +1045,7 @@ class TournamentCog(commands.Cog, name="Tournament"):
 
             # Fetch match
             match = (
-                await models.Match.filter(message=self.dialogs[payload.message_id])
+                await models.Match.filter(message=dialog_match_message)
                 .select_related("team1", "team2")
                 .first()
             )
@@ -947,7 +1107,44 @@ class TournamentCog(commands.Cog, name="Tournament"):
 
             # Delete dialog
             await message.delete()
-            self.dialogs.pop(payload.message_id)
+            await match_index.remove_dialog(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        """Removes the pick from a user's prediction when they remove their reaction from a match post."""
+        if payload.user_id == self.bot.user.id:
+            return
+
+        match = await self.tournament_manager.get_open_match(payload.message_id)
+        if match is None:
+            return
+
+        if match.tracked:
+            self.tournament_manager.reaction_queue.put(payload)
+            return
+
+        team, games = match.parse_emoji(payload.emoji)
+        if team is not None or games is not None:
+            await self.tournament_manager.remove_prediction(
+                match.match_id, payload.user_id, team=team, games=games
+            )
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        """Forgets a match end dialog that was deleted without ending its match."""
+        match_index = self.tournament_manager.match_index
+        if match_index.get_dialog(payload.message_id) is not None:
+            await match_index.remove_dialog(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(
+        self, payload: discord.RawBulkMessageDeleteEvent
+    ):
+        """Forgets the match end dialogs among purged messages."""
+        match_index = self.tournament_manager.match_index
+        for message_id in payload.message_ids:
+            if match_index.get_dialog(message_id) is not None:
+                await match_index.remove_dialog(message_id)
 
     async def cog_command_error(self, ctx, error):
         message = ""
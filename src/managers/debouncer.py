@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class Debouncer(ABC, Generic[K, T]):
+    """Handles the work queued on a key once per short window.
+
+    Subclasses queue work in `pending` and call `touch`, the first touch of a key
+    opens the window and `handle` is called with the pending work when it closes.
+    Work on the same key is never handled concurrently.
+    """
+
+    window: float
+    pending: dict[K, T]
+
+    def __init__(self, window: float):
+        self.window = window
+        self.pending = {}
+        self._tasks: dict[K, asyncio.Task] = {}
+        self._locks: dict[K, asyncio.Lock] = {}
+        self._lock_users: Counter[K] = Counter()
+
+    @abstractmethod
+    async def handle(self, key: K, work: T):
+        """Handle the work that was pending on the key."""
+
+    def touch(self, key: K):
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._flush_later(key))
+
+    async def _flush_later(self, key: K):
+        await asyncio.sleep(self.window)
+        try:
+            await self.flush(key)
+        except Exception:
+            logging.exception(f"Error while handling {key}")
+
+    @asynccontextmanager
+    async def hold(self, key: K) -> AsyncIterator[None]:
+        """Hold back the handling of a key, work keeps being queued in the meantime."""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            # Drop the lock once nobody holds or waits for it
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    async def flush(self, key: K):
+        """Handle the pending work of a key now, after any work of it that is being handled."""
+        async with self.hold(key):
+            task = self._tasks.pop(key, None)
+            if task is not None and task is not asyncio.current_task():
+                task.cancel()
+
+            if key not in self.pending:
+                return
+            await self.handle(key, self.pending.pop(key))
+
+    def forget(self, key: K):
+        """Drop the pending work of a key."""
+        task = self._tasks.pop(key, None)
+        if task is not None:
+            task.cancel()
+        self.pending.pop(key, None)
+
+    def cancel(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self.pending.clear()
@@ -0,0 +1,86 @@
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import colorthief
+import discord
+import tortoise.exceptions
+
+from src import models
+
+
+def dominant_colour(image: bytes) -> int:
+    """Return the dominant colour of an image as 0xRRGGBB.
+
+    This is a full resolution pass in pure Python, run it in the executor.
+    """
+    r, g, b = colorthief.ColorThief(io.BytesIO(image)).get_color(quality=1)
+    return (r << 16) + (g << 8) + b
+
+
+class EmojiColours:
+    """Dominant colours of custom emojis.
+
+    A colour is computed once in a worker process, then stored in the database
+    and kept in memory.
+    """
+
+    _colours: dict[int, int]  # {emoji id: colour}
+    _pending: dict[int, asyncio.Task]  # {emoji id: computation}
+    _executor: Optional[ProcessPoolExecutor]
+
+    def __init__(self):
+        self._colours = {}
+        self._pending = {}
+        self._executor = None
+
+    async def get(self, emoji: Optional[discord.Emoji]) -> Optional[discord.Colour]:
+        """Return the dominant colour of the emoji, None if its image can't be read.
+
+        The emoji is None when it was deleted or the bot can't see it anymore.
+        """
+        if emoji is None:
+            return None
+
+        colour = self._colours.get(emoji.id)
+        if colour is None:
+            # Emojis that are computed already are awaited, not computed again
+            task = self._pending.get(emoji.id)
+            if task is None:
+                task = asyncio.create_task(self._load(emoji))
+                self._pending[emoji.id] = task
+                task.add_done_callback(lambda _: self._pending.pop(emoji.id, None))
+            colour = await asyncio.shield(task)
+            if colour is None:
+                return None
+
+        return discord.Colour(colour)
+
+    async def _load(self, emoji: discord.Emoji) -> Optional[int]:
+        stored = await models.EmojiColour.get_or_none(emoji=emoji.id)
+        if stored is not None:
+            self._colours[emoji.id] = stored.colour
+            return stored.colour
+
+        try:
+            image = await emoji.url.read()
+        except Exception:
+            return None
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+        colour = await loop.run_in_executor(self._executor, dominant_colour, image)
+
+        try:
+            await models.EmojiColour.create(emoji=emoji.id, colour=colour)
+        except tortoise.exceptions.IntegrityError:
+            pass
+        self._colours[emoji.id] = colour
+        return colour
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,46 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class ExpiringSet:
+    """Set whose members are forgotten after a time to live.
+
+    When full, the least recently added member is dropped to make room.
+    """
+
+    ttl: float
+    max_size: int
+    _added: OrderedDict[Hashable, float]  # {member: time it was added}, oldest first
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._added = OrderedDict()
+
+    def __contains__(self, member: Hashable) -> bool:
+        added = self._added.get(member)
+        if added is None:
+            return False
+        if time.monotonic() - added >= self.ttl:
+            del self._added[member]
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return len(self._added)
+
+    def add(self, member: Hashable):
+        self._added.pop(member, None)
+        self._added[member] = time.monotonic()
+
+        # Expired members are the oldest, so they are dropped first
+        now = time.monotonic()
+        while self._added:
+            oldest, added = next(iter(self._added.items()))
+            if now - added < self.ttl and len(self._added) <= self.max_size:
+                break
+            del self._added[oldest]
+
+    def discard(self, member: Hashable):
+        self._added.pop(member, None)
@@ -0,0 +1,55 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from src import models
+
+
+@dataclass
+class GuildTeams:
+    by_code: dict[str, models.Team] = field(default_factory=dict)
+    by_page: dict[str, models.Team] = field(default_factory=dict)  # Fandom teams only
+
+
+class GuildCache:
+    """Per-guild cache of the teams, and of the running tournament of every channel.
+
+    The code that writes teams or tournaments drops the entries it changes.
+    """
+
+    _teams: dict[int, GuildTeams]  # {guild id: teams}
+    _tournaments: dict[int, Optional[models.Tournament]]  # {channel id: tournament}
+
+    def __init__(self):
+        self._teams = {}
+        self._tournaments = {}
+
+    async def teams(self, guild: int) -> GuildTeams:
+        teams = self._teams.get(guild)
+        if teams is None:
+            teams = GuildTeams()
+            for team in await models.Team.filter(guild=guild):
+                teams.by_code[team.code] = team
+                if team.is_fandom:
+                    teams.by_page[team.fandom_overview_page] = team
+            self._teams[guild] = teams
+        return teams
+
+    async def team(self, guild: int, code: str) -> Optional[models.Team]:
+        return (await self.teams(guild)).by_code.get(code)
+
+    async def running_tournament(self, channel: int) -> Optional[models.Tournament]:
+        if channel not in self._tournaments:
+            self._tournaments[channel] = await models.Tournament.get_or_none(
+                channel=channel,
+                running=models.TournamentRunningEnum.RUNNING,
+            )
+        return self._tournaments[channel]
+
+    def invalidate_teams(self, guild: int):
+        self._teams.pop(guild, None)
+
+    def invalidate_tournament(self, channel: int):
+        self._tournaments.pop(channel, None)
+
+
+guild_cache = GuildCache()
@@ -0,0 +1,193 @@
+import asyncio
+import math
+from dataclasses import dataclass, field
+from typing import Optional, Union
+from uuid import UUID
+
+import discord
+
+from src import models
+
+GAMES_EMOJIS = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
+
+EmojiKey = Union[int, str]  # Custom emoji id or unicode emoji
+
+
+@dataclass
+class OpenMatch:
+    """What the reaction handlers need to know about an open match message."""
+
+    match_id: UUID
+    message: int
+    team_emojis: tuple[int, int]
+    bestof: int
+
+    # The prediction reactions every user currently has on the message,
+    # only known (tracked) once they have been read from the message
+    selections: dict[int, set[EmojiKey]] = field(default_factory=dict)
+    tracked: bool = False
+
+    @classmethod
+    def from_match(cls, match: models.Match) -> "OpenMatch":
+        # team1 and team2 have to be fetched
+        return cls(
+            match_id=match.id,
+            message=match.message,
+            team_emojis=(match.team1.emoji, match.team2.emoji),
+            bestof=match.bestof,
+        )
+
+    @property
+    def games_emojis(self) -> list[str]:
+        return GAMES_EMOJIS[math.floor(self.bestof / 2) : self.bestof]
+
+    def parse_emoji(
+        self, emoji: Union[discord.Emoji, discord.PartialEmoji, str]
+    ) -> tuple[Optional[int], Optional[int]]:
+        """Return the (team, games) a reaction stands for, None for neither."""
+        emoji_id = getattr(emoji, "id", None)
+        if emoji_id is not None and emoji_id in self.team_emojis:
+            return self.team_emojis.index(emoji_id) + 1, None
+
+        games_emojis = self.games_emojis
+        if emoji_id is None and str(emoji) in games_emojis:
+            return None, games_emojis.index(str(emoji)) + math.ceil(self.bestof / 2)
+
+        return None, None
+
+    @staticmethod
+    def emoji_key(emoji: Union[discord.Emoji, discord.PartialEmoji, str]) -> EmojiKey:
+        emoji_id = getattr(emoji, "id", None)
+        return str(emoji) if emoji_id is None else emoji_id
+
+    def select(
+        self, user_id: int, emoji: Union[discord.Emoji, discord.PartialEmoji, str]
+    ) -> list[EmojiKey]:
+        """Register a reaction of a user.
+
+        Returns the user's other reactions in the same category (team or games), which should be removed.
+        """
+        team, games = self.parse_emoji(emoji)
+        if team is not None:
+            category = set(self.team_emojis)
+        elif games is not None:
+            category = set(self.games_emojis)
+        else:
+            return []
+
+        key = self.emoji_key(emoji)
+        selection = self.selections.setdefault(user_id, set())
+        to_remove = [k for k in selection if k in category and k != key]
+        selection.difference_update(to_remove)
+        selection.add(key)
+
+        return to_remove
+
+    def prediction(self, user_id: int) -> tuple[int, int]:
+        """Return the (team, games) prediction following from a user's reactions, 0 for no pick."""
+        team = 0
+        games = 0
+        games_emojis = self.games_emojis
+        for key in self.selections.get(user_id, ()):
+            if key in self.team_emojis:
+                team = self.team_emojis.index(key) + 1
+            elif key in games_emojis:
+                games = games_emojis.index(key) + math.ceil(self.bestof / 2)
+        return team, games
+
+    def deselect(
+        self, user_id: int, emoji: Union[discord.Emoji, discord.PartialEmoji, str]
+    ):
+        selection = self.selections.get(user_id)
+        if selection is None:
+            return
+
+        selection.discard(self.emoji_key(emoji))
+        if not selection:
+            self.selections.pop(user_id)
+
+
+class MatchIndex:
+    """In-memory index of the messages reaction events can be relevant for.
+
+    Reactions on any other message are rejected without touching the database.
+    """
+
+    matches: dict[int, OpenMatch]  # {match message: open match}
+    dialogs: dict[int, int]  # {dialog message: match message}
+    match_dialogs: dict[int, int]  # {match message: dialog message}
+    loaded: bool
+
+    def __init__(self):
+        self.matches = {}
+        self.dialogs = {}
+        self.match_dialogs = {}
+        self.loaded = False
+        self._loading: Optional[asyncio.Task] = None
+
+    async def load(self) -> list[models.Match]:
+        """Load the open matches and the dialogs, return the open matches.
+
+        Calls made while a load is in progress share it instead of starting another.
+        """
+        if self._loading is None:
+            self._loading = asyncio.create_task(self._load())
+            self._loading.add_done_callback(self._load_done)
+        return await asyncio.shield(self._loading)
+
+    async def _load(self) -> list[models.Match]:
+        matches = await models.Match.filter(
+            running=models.MatchRunningEnum.RUNNING
+        ).select_related("tournament", "team1", "team2")
+        await self.load_dialogs()
+        self.set_matches(matches)
+        return matches
+
+    def _load_done(self, task: asyncio.Task):
+        self._loading = None
+
+    def set_matches(self, matches: list[models.Match]):
+        # Keep the matches that are indexed already, they may be tracked
+        self.matches = {
+            m.message: self.matches.get(m.message) or OpenMatch.from_match(m)
+            for m in matches
+        }
+        self.loaded = True
+
+    def add_match(self, match: models.Match, tracked: bool = False):
+        open_match = OpenMatch.from_match(match)
+        open_match.tracked = tracked
+        self.matches[match.message] = open_match
+
+    def remove_match(self, match: models.Match):
+        self.matches.pop(match.message, None)
+
+    def get_match(self, message: int) -> Optional[OpenMatch]:
+        return self.matches.get(message)
+
+    async def load_dialogs(self):
+        """Load the match end dialogs that were open when the bot last stopped."""
+        rows = await models.MatchEndDialog.all().values_list(
+            "message", "match__message"
+        )
+        self.dialogs = dict(rows)
+        self.match_dialogs = {m: d for d, m in rows}
+
+    async def add_dialog(self, dialog_message: int, match: models.Match):
+        await models.MatchEndDialog.create(message=dialog_message, match=match)
+        self.dialogs[dialog_message] = match.message
+        self.match_dialogs[match.message] = dialog_message
+
+    async def remove_dialog(self, dialog_message: int):
+        await models.MatchEndDialog.filter(message=dialog_message).delete()
+        match_message = self.dialogs.pop(dialog_message, None)
+        self.match_dialogs.pop(match_message, None)
+
+    def get_dialog(self, dialog_message: int) -> Optional[int]:
+        return self.dialogs.get(dialog_message)
+
+    def get_match_dialog(self, match_message: int) -> Optional[int]:
+        return self.match_dialogs.get(match_message)
+
+    def has_dialog(self, match_message: int) -> bool:
+        return match_message in self.match_dialogs
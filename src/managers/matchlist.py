@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+import discord
+from tortoise.expressions import RawSQL
+from tortoise.query_utils import Q
+
+from src import models
+
+PAGE_SIZE = 15  # Matches per page, if they fit in one message
+MAX_LENGTH = 2000
+PREVIOUS_EMOJI = "◀️"
+NEXT_EMOJI = "▶️"
+
+# Ended, closed and open matches are listed in this order
+SECTIONS = ["Ended Matches", "Closed Matches", "Open Matches"]
+SECTION_SQL = (
+    'CASE "match"."running"'
+    f" WHEN {models.MatchRunningEnum.ENDED.value} THEN 0"
+    f" WHEN {models.MatchRunningEnum.CLOSED.value} THEN 1"
+    " ELSE 2 END"
+)
+
+MatchListKey = tuple[int, int]  # (section, id in tournament)
+
+
+async def get_matches_after(
+    tournament: models.Tournament, after: Optional[MatchListKey], limit: int
+) -> list[models.Match]:
+    """Return the tournament's matches in list order that come after the key."""
+    query = models.Match.filter(tournament=tournament).annotate(
+        section=RawSQL(SECTION_SQL)
+    )
+    if after is not None:
+        section, id_in_tournament = after
+        query = query.filter(
+            Q(section__gt=section)
+            | Q(section=section, id_in_tournament__gt=id_in_tournament)
+        )
+    return (
+        await query.order_by("section", "id_in_tournament")
+        .limit(limit)
+        .select_related("team1", "team2")
+    )
+
+
+def format_match(match: models.Match, client: discord.Client) -> str:
+    team1: models.Team = match.team1
+    team2: models.Team = match.team2
+    team1_emoji = client.get_emoji(team1.emoji)
+    team2_emoji = client.get_emoji(team2.emoji)
+    if match.running == models.MatchRunningEnum.ENDED:
+        if match.result == 1:
+            return f"{match.id_in_tournament}. {match.name}: **{team1_emoji} {team1.name}** vs {team2.name} {team2_emoji} - BO{match.bestof} - Result: {match.win_games}-{match.lose_games}"
+        return f"{match.id_in_tournament}. {match.name}: {team1_emoji} {team1.name} vs **{team2.name} {team2_emoji}** - BO{match.bestof} - Result: {match.lose_games}-{match.win_games}"
+    return f"{match.id_in_tournament}. {match.name}: {team1_emoji} {team1.name} vs {team2.name} {team2_emoji} - BO{match.bestof}"
+
+
+@dataclass
+class MatchList:
+    """A match list message that can be paged back and forth.
+
+    Every page is one keyset query starting after the last match of the page before.
+    """
+
+    tournament: models.Tournament
+    starts: list[Optional[MatchListKey]] = field(default_factory=lambda: [None])
+    next_start: Optional[MatchListKey] = None  # None on the last page
+    content: str = ""
+
+    @property
+    def page(self) -> int:
+        return len(self.starts)
+
+    async def load(self, client: discord.Client):
+        """Load and render the current page."""
+        matches = await get_matches_after(
+            self.tournament, self.starts[-1], PAGE_SIZE + 1
+        )
+
+        lines = [f"***{self.tournament.name} Matches*** (Page {self.page})"]
+        if not matches and self.page == 1:
+            lines.append("There are no matches in this tournament.")
+
+        length = len(lines[0])
+        section = None
+        shown: list[models.Match] = []
+        for match in matches[:PAGE_SIZE]:
+            match_lines = []
+            if match.section != section:
+                match_lines += ["", f"**{SECTIONS[match.section]}:**"]
+            match_lines.append(format_match(match, client))
+
+            match_length = sum(len(line) + 1 for line in match_lines)
+            if shown and length + match_length > MAX_LENGTH:
+                break
+            lines += match_lines
+            length += match_length
+            section = match.section
+            shown.append(match)
+
+        self.next_start = None
+        if len(shown) < len(matches):
+            last = shown[-1]
+            self.next_start = (last.section, last.id_in_tournament)
+
+        self.content = "\n".join(lines)
+
+    async def next(self, client: discord.Client) -> bool:
+        """Go to the next page, returns false if there is none."""
+        if self.next_start is None:
+            return False
+        self.starts.append(self.next_start)
+        await self.load(client)
+        return True
+
+    async def previous(self, client: discord.Client) -> bool:
+        """Go to the previous page, returns false if there is none."""
+        if len(self.starts) == 1:
+            return False
+        self.starts.pop()
+        await self.load(client)
+        return True
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from src.managers.debouncer import Debouncer
+from src.managers.messageservice import MessageService
+
+Renderer = Callable[[], Awaitable[str]]
+
+
+class MessageCoalescer(Debouncer[int, tuple[int, Renderer]]):
+    """Coalesces the edits of messages that are rendered from the current state.
+
+    Callers mark a message dirty together with how to render it. The first mark
+    opens a short window, when it closes the message is rendered once with the
+    latest renderer and only edited if the content changed since our last edit.
+    """
+
+    messages: MessageService
+    max_contents: int
+    # {message: content of our last edit}, least recently edited first
+    _contents: OrderedDict[int, str]
+
+    def __init__(
+        self, messages: MessageService, window: float = 2.0, max_contents: int = 256
+    ):
+        super().__init__(window)
+        self.messages = messages
+        self.max_contents = max_contents
+        self._contents = OrderedDict()
+
+    def mark_dirty(self, channel_id: int, message_id: int, render: Renderer):
+        self.pending[message_id] = (channel_id, render)
+        self.touch(message_id)
+
+    async def handle(self, message_id: int, dirty: tuple[int, Renderer]):
+        channel_id, render = dirty
+        content = await render()
+        if self._contents.get(message_id) == content:
+            self._contents.move_to_end(message_id)
+            return
+
+        # Forget the old content first, a failed edit may still have gone through
+        self._contents.pop(message_id, None)
+        await self.messages.edit(channel_id, message_id, content=content)
+        self._contents[message_id] = content
+        while len(self._contents) > self.max_contents:
+            self._contents.popitem(last=False)
+
+    async def edit_now(self, channel_id: int, message_id: int, render: Renderer):
+        """Edit a message right away, taking the place of a pending edit.
+
+        Unlike scheduled edits, errors are raised to the caller.
+        """
+        self.pending[message_id] = (channel_id, render)
+        await self.flush(message_id)
@@ -0,0 +1,68 @@
+from typing import Awaitable, Callable, TypeVar
+
+import discord
+
+from src.managers.requestscheduler import Priority, RequestScheduler
+
+T = TypeVar("T")
+
+
+class MessageService:
+    """Edits and fetches the bot's messages by id.
+
+    Edits go through partial messages, which is one REST call instead of a fetch
+    followed by an edit. All requests are made through the scheduler.
+    """
+
+    client: discord.Client
+    scheduler: RequestScheduler
+    rest_calls: int  # REST calls made through the service
+    rest_calls_saved: int  # Fetches skipped by editing partial messages
+
+    def __init__(self, client: discord.Client, scheduler: RequestScheduler):
+        self.client = client
+        self.scheduler = scheduler
+        self.rest_calls = 0
+        self.rest_calls_saved = 0
+
+    def partial(self, channel_id: int, message_id: int) -> discord.PartialMessage:
+        channel: discord.TextChannel = self.client.get_channel(channel_id)
+        return channel.get_partial_message(message_id)
+
+    async def request(
+        self,
+        channel_id: int,
+        request: Callable[[], Awaitable[T]],
+        priority: Priority = Priority.BACKGROUND,
+    ) -> T:
+        """Make a request concerning a channel through the scheduler."""
+        channel: discord.TextChannel = self.client.get_channel(channel_id)
+        guild = channel.guild.id if getattr(channel, "guild", None) else None
+        self.rest_calls += 1
+        return await self.scheduler.run(request, guild, priority)
+
+    async def edit(
+        self,
+        channel_id: int,
+        message_id: int,
+        priority: Priority = Priority.BACKGROUND,
+        **fields,
+    ) -> discord.Message:
+        partial = self.partial(channel_id, message_id)
+        message = await self.request(
+            channel_id, lambda: partial.edit(**fields), priority
+        )
+        self.rest_calls_saved += 1
+        return message
+
+    async def fetch(
+        self,
+        channel_id: int,
+        message_id: int,
+        priority: Priority = Priority.BACKGROUND,
+    ) -> discord.Message:
+        """Fetch the message with its current content and reactions."""
+        channel: discord.TextChannel = self.client.get_channel(channel_id)
+        return await self.request(
+            channel_id, lambda: channel.fetch_message(message_id), priority
+        )
@@ -0,0 +1,35 @@
+import logging
+from typing import Awaitable, Callable
+
+import discord
+
+from src.managers.debouncer import Debouncer
+
+ReactionHandler = Callable[[int, list[discord.RawReactionActionEvent]], Awaitable[None]]
+
+
+class ReactionQueue(Debouncer[int, list[discord.RawReactionActionEvent]]):
+    """Collects reaction events per message and hands them to the handler in batches.
+
+    The first event on a message opens a short window, all events on that
+    message received during the window are handled together when it closes.
+    Batches of the same message are never handled concurrently.
+    """
+
+    handler: ReactionHandler
+
+    def __init__(self, handler: ReactionHandler, window: float = 1.0):
+        super().__init__(window)
+        self.handler = handler
+
+    def put(self, payload: discord.RawReactionActionEvent):
+        self.pending.setdefault(payload.message_id, []).append(payload)
+        self.touch(payload.message_id)
+
+    async def handle(
+        self, message_id: int, events: list[discord.RawReactionActionEvent]
+    ):
+        try:
+            await self.handler(message_id, events)
+        except Exception:
+            logging.exception(f"Error while handling reactions on {message_id}")
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+GUILD_LIMIT = 5  # Slots a guild holds with requests that aren't interactive
+ACTIVE_GUILDS = 6  # Guilds that can use all of their slots at the same time
+RESERVED_SLOTS = 2  # Slots only used by interactive requests
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # Responses to something a user just did
+    BACKGROUND = 1  # Fandom sync, match closing and ending, tournament message edits
+    BULK = 2  # Re-rendering many messages at once
+
+
+@dataclass
+class WaitStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, wait: float):
+        self.count += 1
+        self.total += wait
+        self.max = max(self.max, wait)
+
+
+class RequestScheduler:
+    """Limits the outbound Discord requests of the bot that are in flight at once.
+
+    When all slots are taken, requests wait for one in order of priority. Within
+    a priority the guilds take turns, so a guild with many queued requests
+    doesn't hold up the others.
+
+    A request keeps its slot while discord.py waits out a rate limit. So that
+    such requests can't stall everyone, `reserved` slots are only used by
+    interactive requests, and a single guild holds at most `guild_limit` slots
+    with requests of a lower priority. By default there are enough slots for
+    `active_guilds` guilds to use all of theirs besides the reserved ones.
+    """
+
+    concurrency: int
+    reserved: int
+    guild_limit: int
+    waits: dict[Priority, WaitStats]
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        reserved: int = RESERVED_SLOTS,
+        guild_limit: int = GUILD_LIMIT,
+        active_guilds: int = ACTIVE_GUILDS,
+    ):
+        if concurrency is None:
+            concurrency = guild_limit * active_guilds + reserved
+        self.concurrency = concurrency
+        self.reserved = reserved
+        self.guild_limit = guild_limit
+        self.waits = {p: WaitStats() for p in Priority}
+        self._running = 0
+        self._running_background = 0  # Slots held by requests that aren't interactive
+        # {guild: slots held by its requests that aren't interactive}
+        self._guild_running: Counter = Counter()
+        # {priority: {guild: waiting requests}}, guilds in the order of their turns
+        self._queues: dict[Priority, OrderedDict] = {p: OrderedDict() for p in Priority}
+
+    def depth(self, priority: Optional[Priority] = None) -> int:
+        """Number of requests waiting for a slot, of one priority or in total."""
+        priorities = list(Priority) if priority is None else [priority]
+        return sum(
+            1
+            for p in priorities
+            for waiters in self._queues[p].values()
+            for future in waiters
+            if not future.done()
+        )
+
+    async def run(
+        self,
+        request: Callable[[], Awaitable[T]],
+        guild: Optional[int] = None,
+        priority: Priority = Priority.BACKGROUND,
+    ) -> T:
+        """Make the request once a slot is free and return its result."""
+        queued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(guild, deque()).append(future)
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Give the slot to the next request if we got one
+            if future.done() and not future.cancelled():
+                self._release(guild, priority)
+            raise
+        self.waits[priority].add(time.monotonic() - queued_at)
+
+        try:
+            return await request()
+        finally:
+            self._release(guild, priority)
+
+    def _can_start(self, priority: Priority, guild: Optional[int]) -> bool:
+        if self._running >= self.concurrency:
+            return False
+        if priority == Priority.INTERACTIVE:
+            return True
+        if self._running_background >= self.concurrency - self.reserved:
+            return False
+        return guild is None or self._guild_running[guild] < self.guild_limit
+
+    def _acquire(self, guild: Optional[int], priority: Priority):
+        self._running += 1
+        if priority != Priority.INTERACTIVE:
+            self._running_background += 1
+            self._guild_running[guild] += 1
+
+    def _release(self, guild: Optional[int], priority: Priority):
+        self._running -= 1
+        if priority != Priority.INTERACTIVE:
+            self._running_background -= 1
+            self._guild_running[guild] -= 1
+            if not self._guild_running[guild]:
+                del self._guild_running[guild]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Give free slots to the waiting requests that may use them."""
+        while self._running < self.concurrency and self._start_next():
+            pass
+
+    def _start_next(self) -> bool:
+        for priority in Priority:
+            guilds = self._queues[priority]
+            for guild in list(guilds):
+                waiters = guilds[guild]
+                # Drop cancelled requests
+                while waiters and waiters[0].done():
+                    waiters.popleft()
+                if not waiters:
+                    del guilds[guild]
+                    continue
+                if not self._can_start(priority, guild):
+                    continue
+
+                future = waiters.popleft()
+                if waiters:
+                    guilds.move_to_end(guild)
+                else:
+                    del guilds[guild]
+                self._acquire(guild, priority)
+                future.set_result(None)
+                return True
+        return False
@@ -0,0 +1,68 @@
+import asyncio
+import io
+from collections import OrderedDict
+from typing import Optional
+
+from PIL import Image
+
+from src.aiomediawiki.aiomediawiki import leaguepedia
+
+EMOJI_MAX_BYTES = 256 * 1024  # Discord's size limit for emoji images
+EMOJI_SIZE = 128  # Emojis are never shown larger than this
+
+
+def prepare_emoji_image(image: bytes, max_bytes: int = EMOJI_MAX_BYTES) -> bytes:
+    """Resize, and if needed quantize and shrink, an image until it fits the emoji size limit.
+
+    CPU heavy, run it in the executor.
+    """
+    img = Image.open(io.BytesIO(image)).convert("RGBA")
+    size = EMOJI_SIZE
+    quantize = False
+    while True:
+        resized = img.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        if quantize:
+            resized = resized.quantize(colors=256, method=Image.FASTOCTREE)
+
+        buffer = io.BytesIO()
+        resized.save(buffer, format="PNG", optimize=True)
+        data = buffer.getvalue()
+        if len(data) <= max_bytes or size <= 32:
+            return data
+
+        # Reduce the colours first, then the size
+        if not quantize:
+            quantize = True
+        else:
+            size //= 2
+
+
+class TeamLogos:
+    """Emoji-ready logos of Leaguepedia teams, cached per team overview page."""
+
+    max_entries: int
+    _logos: OrderedDict[str, bytes]  # {overview page: image}, least recently used first
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._logos = OrderedDict()
+
+    async def get(self, overview_page: str) -> Optional[bytes]:
+        """Return the square logo of the team as an image that fits Discord's emoji limit."""
+        logo = self._logos.get(overview_page)
+        if logo is not None:
+            self._logos.move_to_end(overview_page)
+            return logo
+
+        image = await leaguepedia.get_file(f"{overview_page}logo square.png", size=256)
+        if image is None:
+            return None
+
+        loop = asyncio.get_running_loop()
+        logo = await loop.run_in_executor(None, prepare_emoji_image, image)
+
+        self._logos[overview_page] = logo
+        if len(self._logos) > self.max_entries:
+            self._logos.popitem(last=False)
+        return logo
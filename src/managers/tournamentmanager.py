@@ -1,29 +1,86 @@
-import io
-import itertools
+import asyncio
+import functools
+import logging
 import math
-from typing import Optional
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Awaitable, Iterable, Optional
+from uuid import UUID
 
-import colorthief
 import discord
+import tortoise.exceptions
 import tortoise.functions
 from discord.embeds import Embed
+from discord.ext import commands
 from tortoise.transactions import in_transaction
 
 from src import models
 from src.aiomediawiki.aiomediawiki import leaguepedia
+from src.managers.emojicolours import EmojiColours
+from src.managers.guildcache import guild_cache
+from src.managers.matchindex import EmojiKey, MatchIndex, OpenMatch
+from src.managers.messagecoalescer import MessageCoalescer
+from src.managers.messageservice import MessageService
+from src.managers.reactionqueue import ReactionQueue
+from src.managers.requestscheduler import Priority, RequestScheduler
+from src.utils.scoreindex import ScoreIndex, rank_entries
+
+PREDICTION_CHUNK_SIZE = 500  # Users whose predictions are written at once
+CLOSE_CONCURRENCY = 5  # Matches closed at the same time
+RERENDER_CONCURRENCY = 3  # Match messages re-rendered at the same time
+PROGRESS_INTERVAL = 5.0  # Seconds between edits of a progress message
 
 
 class TournamentManager:
     client: discord.Client
+    score_indexes: dict[UUID, ScoreIndex]  # {tournament id: index}
+    score_index_locks: defaultdict[UUID, asyncio.Lock]  # Held while building an index
+    score_generations: defaultdict[UUID, int]  # {tournament id: index updates}
+    live_matches: set[UUID]  # Open matches whose predictions are recorded from events
+    match_index: MatchIndex
+    reaction_queue: ReactionQueue
+    scheduler: RequestScheduler
+    messages: MessageService
+    tournament_messages: MessageCoalescer
+    jobs: set[asyncio.Task]  # Running background jobs
+    emoji_colours: EmojiColours
 
     def __init__(self, client: discord.Client):
         self.client = client
-
-    async def format_leaderboard(
-        self, tournament: models.Tournament, tabs: Optional[list[str]] = None
-    ):
-        leaderboard = await tournament.calculate_leaderboard(tabs=tabs)
-
+        self.score_indexes = {}
+        self.score_index_locks = defaultdict(asyncio.Lock)
+        self.score_generations = defaultdict(int)
+        self.live_matches = set()
+        self.match_index = MatchIndex()
+        self.reaction_queue = ReactionQueue(self.process_reactions)
+        self.scheduler = RequestScheduler()
+        self.messages = MessageService(client, self.scheduler)
+        self.tournament_messages = MessageCoalescer(self.messages)
+        self.jobs = set()
+        self.emoji_colours = EmojiColours()
+
+    async def get_score_index(self, tournament: models.Tournament) -> ScoreIndex:
+        index = self.score_indexes.get(tournament.id)
+        if index is not None:
+            return index
+
+        async with self.score_index_locks[tournament.id]:
+            index = self.score_indexes.get(tournament.id)
+            if index is not None:
+                return index
+
+            generation = self.score_generations[tournament.id]
+            index = ScoreIndex(await tournament.calculate_leaderboard())
+            # A match ended while the leaderboard was calculated, it may or may
+            # not be part of it, so only keep the index for this caller
+            if self.score_generations[tournament.id] == generation:
+                self.score_indexes[tournament.id] = index
+            return index
+
+    def format_ranked_entries(
+        self, ranked: list[tuple[int, models.ScoreboardEntry]]
+    ) -> str:
         # Calculate formatting
         rank_size = 0
         name_size = 0
@@ -31,29 +88,15 @@ class TournamentManager:
         correct_size = 0
         percent_size = 0  # 100.0%
 
-        counter = itertools.count(1)
-        rank = 0
-        prev_score = -1
-        for entry in leaderboard:
-            i = next(counter)
-            if prev_score != entry.score:
-                prev_score = entry.score
-                rank = i
+        for rank, entry in ranked:
             rank_size = max(len(str(rank)), rank_size)
             name_size = max(len(entry.user.name), name_size)
             score_size = max(len(str(entry.score)), score_size)
             correct_size = max(len(str(f"{entry.correct}/{entry.total}")), correct_size)
             percent_size = max(len(f"{entry.percentage:.1f}%"), percent_size)
 
-        counter = itertools.count(1)
-        rank = 0
-        prev_score = -1
         str_list = []
-        for entry in leaderboard:
-            i = next(counter)
-            if entry.score != prev_score:
-                prev_score = entry.score
-                rank = i
+        for rank, entry in ranked:
             entry_correct = f"{entry.correct}/{entry.total}"
 
             str_list.append(f"{rank:>{rank_size}}")
@@ -67,6 +110,55 @@ class TournamentManager:
 
         return "".join(str_list)
 
+    async def get_leaderboard(
+        self, tournament: models.Tournament, tabs: Optional[list[str]] = None
+    ) -> list[models.ScoreboardEntry]:
+        # The standings of ended tournaments are frozen when they end
+        if tournament.running == models.TournamentRunningEnum.ENDED and (
+            tabs is None or len(tabs) == 1
+        ):
+            snapshot = await models.LeaderboardSnapshot.get_or_none(
+                tournament=tournament,
+                tab=None if tabs is None else tabs[0],
+            )
+            if snapshot is not None:
+                return snapshot.leaderboard
+
+        return await tournament.calculate_leaderboard(tabs=tabs)
+
+    async def freeze_leaderboards(self, tournament: models.Tournament):
+        """Store the final standings of a tournament, overall and for every tab."""
+        tabs = (
+            await models.Match.filter(
+                tournament=tournament, fandom_tab__not_isnull=True
+            )
+            .distinct()
+            .values_list("fandom_tab", flat=True)
+        )
+
+        snapshots = [
+            models.LeaderboardSnapshot.from_leaderboard(
+                tournament, await tournament.calculate_leaderboard()
+            )
+        ]
+        for tab in tabs:
+            leaderboard = await tournament.calculate_leaderboard(tabs=[tab])
+            snapshots.append(
+                models.LeaderboardSnapshot.from_leaderboard(
+                    tournament, leaderboard, tab
+                )
+            )
+
+        async with in_transaction():
+            await models.LeaderboardSnapshot.filter(tournament=tournament).delete()
+            await models.LeaderboardSnapshot.bulk_create(snapshots)
+
+    async def format_leaderboard(
+        self, tournament: models.Tournament, tabs: Optional[list[str]] = None
+    ):
+        leaderboard = await self.get_leaderboard(tournament, tabs)
+        return self.format_ranked_entries(list(rank_entries(leaderboard)))
+
     async def generate_leaderboard_text(
         self, tournament: models.Tournament, tabs: Optional[list[str]] = None
     ):
@@ -87,6 +179,33 @@ class TournamentManager:
 
         return content
 
+    async def generate_guild_leaderboard_text(
+        self,
+        guild: discord.Guild,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> list[str]:
+        leaderboard = await models.GuildScore.calculate_leaderboard(
+            guild.id, start, end
+        )
+
+        period = ""
+        if start is not None or end is not None:
+            period = f" ({start or '...'} - {end or '...'})"
+
+        paginator = commands.Paginator(max_size=1900, prefix="```c", suffix="```")
+        for line in self.format_ranked_entries(
+            list(rank_entries(leaderboard))
+        ).splitlines():
+            paginator.add_line(line)
+
+        pages = paginator.pages
+        header = f"**{guild.name} Leaderboard{period}**"
+        if not pages:
+            return [header]
+        pages[0] = f"{header}\n\n{pages[0]}"
+        return pages
+
     async def generate_tournament_text(self, tournament: models.Tournament):
         # Header
         content_header = f"**{tournament.name}**"
@@ -124,8 +243,62 @@ class TournamentManager:
 
         return content
 
+    async def load_match_relations(
+        self,
+        matches: Iterable[models.Match],
+        tournament: Optional[models.Tournament] = None,
+    ):
+        """Load the tournament and teams of many matches, with one query each for those not loaded yet.
+
+        Pass the tournament if all matches belong to it, it won't be queried then.
+        """
+        matches = list(matches)
+        if tournament is not None:
+            for match in matches:
+                match.tournament = tournament
+
+        tournament_ids = {
+            m.tournament_id
+            for m in matches
+            if not isinstance(m.tournament, models.Tournament)
+        }
+        team_ids = {
+            team_id
+            for m in matches
+            for team, team_id in ((m.team1, m.team1_id), (m.team2, m.team2_id))
+            if not isinstance(team, models.Team)
+        }
+
+        if tournament_ids:
+            tournaments = await models.Tournament.filter(id__in=tournament_ids)
+            tournaments = {t.id: t for t in tournaments}
+            for match in matches:
+                if match.tournament_id in tournaments:
+                    match.tournament = tournaments[match.tournament_id]
+        if team_ids:
+            teams = {t.id: t for t in await models.Team.filter(id__in=team_ids)}
+            for match in matches:
+                if match.team1_id in teams:
+                    match.team1 = teams[match.team1_id]
+                if match.team2_id in teams:
+                    match.team2 = teams[match.team2_id]
+
+    async def generate_match_texts(
+        self,
+        matches: Iterable[models.Match],
+        tournament: Optional[models.Tournament] = None,
+    ) -> dict[UUID, str]:
+        """Render the messages of many matches at once. Returns {match id: text}."""
+        matches = list(matches)
+        await self.load_match_relations(matches, tournament)
+        return {match.id: self.render_match_text(match) for match in matches}
+
     async def generate_match_text(self, match: models.Match):
-        await match.fetch_related("team1", "team2")
+        await match.fetch_missing_related("team1", "team2")
+        return self.render_match_text(match)
+
+    def render_match_text(self, match: models.Match) -> str:
+        # team1 and team2 have to be loaded
         team1_emoji = self.client.get_emoji(match.team1.emoji)
         team2_emoji = self.client.get_emoji(match.team2.emoji)
 
@@ -166,7 +339,7 @@ class TournamentManager:
         team_correct: list[tuple[str, int]],  # (name, score)
         game_correct: Optional[list[tuple[str, int]]] = None,  # (name, score)
     ) -> list[Embed]:
-        await match.fetch_related("team1", "team2", "tournament")
+        await match.fetch_missing_related("team1", "team2", "tournament")
         if match.result == 1:
             team_winners = match.team1
             team_losers = match.team2
@@ -174,18 +347,11 @@ class TournamentManager:
             team_winners = match.team2
             team_losers = match.team1
 
-        emoji: discord.Emoji = self.client.get_emoji(team_winners.emoji)
-
-        try:
-            img_bytes = await emoji.url.read()
-        except Exception:
-            img_bytes = None
+        emoji: Optional[discord.Emoji] = self.client.get_emoji(team_winners.emoji)
 
-        embed_color = discord.Colour.blurple()
-        if img_bytes:
-            img = io.BytesIO(img_bytes)
-            color = colorthief.ColorThief(img).get_color(quality=1)
-            embed_color = discord.Colour.from_rgb(*color)
+        embed_color = await self.emoji_colours.get(emoji)
+        if embed_color is None:
+            embed_color = discord.Colour.blurple()
 
         embeds = []
 
@@ -194,7 +360,8 @@ class TournamentManager:
             description=f"**{team_winners.name}** defeated **{team_losers.name}** by **{match.win_games}-{match.lose_games}**",
             colour=embed_color,
         )
-        base_embed.set_thumbnail(url=emoji.url)
+        if emoji is not None:
+            base_embed.set_thumbnail(url=emoji.url)
 
         current_embed: discord.Embed = base_embed.copy()
         if len(team_correct) > 0:
@@ -280,32 +447,117 @@ class TournamentManager:
         tournament.message = message.id
 
         await tournament.save()
+        guild_cache.invalidate_tournament(tournament.channel)
 
         return tournament
 
     async def end_tournament(self, tournament: models.Tournament):
         tournament.running = models.TournamentRunningEnum.ENDED
         await tournament.save()
+        guild_cache.invalidate_tournament(tournament.channel)
+
+        await self.freeze_leaderboards(tournament)
 
         # Update tournament message
         await self.update_tournament_message(tournament)
 
     async def update_tournament_message(self, tournament: models.Tournament):
-        channel: discord.TextChannel = self.client.get_channel(tournament.channel)
-        tournament_message: discord.Message = await channel.fetch_message(
-            tournament.message
+        await self.tournament_messages.edit_now(
+            tournament.channel,
+            tournament.message,
+            lambda: self.generate_tournament_text(tournament),
         )
-        new_content = await self.generate_tournament_text(tournament)
-        await tournament_message.edit(content=new_content)
 
-    async def update_match_message(self, match: models.Match):
-        await match.fetch_related("tournament")
-        channel: discord.TextChannel = self.client.get_channel(
-            match.tournament.channel,
+    def schedule_tournament_message_update(self, tournament: models.Tournament):
+        """Update the tournament message shortly, together with any other changes made until then."""
+        self.tournament_messages.mark_dirty(
+            tournament.channel,
+            tournament.message,
+            lambda: self.generate_tournament_text(tournament),
         )
-        match_message: discord.Message = await channel.fetch_message(match.message)
-        new_content = await self.generate_match_text(match)
-        await match_message.edit(content=new_content)
+
+    async def update_match_message(
+        self, match: models.Match, priority: Priority = Priority.BACKGROUND
+    ):
+        texts = await self.generate_match_texts([match])
+        await self.messages.edit(
+            match.tournament.channel, match.message, priority, content=texts[match.id]
+        )
+
+    async def rerender_matches(
+        self,
+        matches: list[models.Match],
+        progress: Optional[discord.Message] = None,
+        concurrency: int = RERENDER_CONCURRENCY,
+    ):
+        """Update the messages of many matches, at most `concurrency` at the same time.
+
+        All messages are rendered up front. A match that fails to update is logged
+        and doesn't stop the others. If given, the progress message is edited every
+        few seconds with the number of updated messages, and reports the outcome.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        texts: dict[UUID, str] = {}
+        updated = 0
+        failed = 0
+        last_report = time.monotonic()
+
+        async def report(content: str):
+            if progress is None:
+                return
+            try:
+                await self.messages.edit(
+                    progress.channel.id, progress.id, content=content
+                )
+            except Exception:
+                logging.exception("Could not edit progress message")
+
+        async def rerender(match: models.Match):
+            nonlocal updated, failed, last_report
+            async with semaphore:
+                try:
+                    await self.messages.edit(
+                        match.tournament.channel,
+                        match.message,
+                        Priority.BULK,
+                        content=texts[match.id],
+                    )
+                    updated += 1
+                except Exception:
+                    failed += 1
+                    logging.exception(f"Could not update message of match {match.id}")
+
+            if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                await report(
+                    f"Updating match messages... ({updated + failed}/{len(matches)})"
+                )
+
+        try:
+            texts = await self.generate_match_texts(matches)
+            await asyncio.gather(*[rerender(match) for match in matches])
+        except Exception:
+            logging.exception("Could not update match messages")
+            await report(
+                f"Could not update the match messages, an error occured after updating {updated}/{len(matches)}."
+            )
+            return
+
+        content = f"Updated {updated}/{len(matches)} match messages."
+        if failed:
+            content += f" {failed} could not be updated."
+        await report(content)
+
+    def start_job(self, coro: Awaitable):
+        """Run a coroutine in the background, it's cancelled when the cog unloads."""
+        task = asyncio.create_task(coro)
+        self.jobs.add(task)
+        task.add_done_callback(self.jobs.discard)
+
+    def cancel_jobs(self):
+        for task in self.jobs:
+            task.cancel()
+        self.jobs.clear()
 
     async def start_match(
         self,
@@ -316,6 +568,7 @@ class TournamentManager:
         team2: models.Team,
         fandom_tab: Optional[str] = None,
         fandom_initialn_matchintab: Optional[int] = None,
+        priority: Priority = Priority.BACKGROUND,
     ) -> models.Match:
         max_id = (
             await models.Match.filter(tournament=tournament)
@@ -340,7 +593,11 @@ class TournamentManager:
 
         # Send message
         channel: discord.abc.Messageable = self.client.get_channel(tournament.channel)
-        message: discord.Message = await channel.send(content=message_text)
+        message: discord.Message = await self.messages.request(
+            tournament.channel,
+            functools.partial(channel.send, content=message_text),
+            priority,
+        )
         match.message = message.id
 
         try:
@@ -349,142 +606,493 @@ class TournamentManager:
             await message.delete()
             raise e
 
+        self.live_matches.add(match.id)
+        # A new message has no reactions yet, so nothing to read
+        self.match_index.add_match(match, tracked=True)
+
         # Add emoji
-        await message.add_reaction(self.client.get_emoji(team1.emoji))
-        await message.add_reaction(self.client.get_emoji(team2.emoji))
+        emojis = [
+            self.client.get_emoji(team1.emoji),
+            self.client.get_emoji(team2.emoji),
+        ]
 
         games_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
 
         if bestof > 1:
             for i in range(math.floor(bestof / 2), bestof):
-                await message.add_reaction(games_emojis[i])
+                emojis.append(games_emojis[i])
+
+        for emoji in emojis:
+            await self.messages.request(
+                tournament.channel,
+                functools.partial(message.add_reaction, emoji),
+                priority,
+            )
 
         return match
 
-    async def close_match(self, match: models.Match, update_message=True):
-        # Safeguard
-        if match.running != models.MatchRunningEnum.RUNNING:
+    async def get_open_match(self, message: int) -> Optional[OpenMatch]:
+        if not self.match_index.loaded:
+            await self.match_index.load()
+        return self.match_index.get_match(message)
+
+    async def record_prediction(
+        self,
+        match_id: UUID,
+        user: discord.abc.User,
+        team: Optional[int] = None,
+        games: Optional[int] = None,
+    ):
+        """Store a team and/or games pick a user made on an open match."""
+        users_db = await models.User.bulk_upsert({user.id: user.name})
+        user_db = users_db[user.id]
+
+        changes = {}
+        if team is not None:
+            changes["team"] = team
+        if games is not None:
+            changes["games"] = games
+
+        updated = await models.Prediction.filter(
+            match_id=match_id, user=user_db
+        ).update(**changes)
+        if updated:
             return
 
-        # Load related fields
-        await match.fetch_related("tournament", "team1", "team2")
+        try:
+            await models.Prediction.create(
+                match_id=match_id, user=user_db, team=team or 0, games=games or 0
+            )
+        except tortoise.exceptions.IntegrityError:
+            # Created by a concurrent reaction event
+            await models.Prediction.filter(match_id=match_id, user=user_db).update(
+                **changes
+            )
 
-        channel: discord.TextChannel = self.client.get_channel(match.tournament.channel)
-        message: discord.Message = await channel.fetch_message(match.message)
+    async def remove_prediction(
+        self,
+        match_id: UUID,
+        discord_id: int,
+        team: Optional[int] = None,
+        games: Optional[int] = None,
+    ):
+        """Undo a team and/or games pick a user removed from an open match."""
+        user_db = await models.User.get_or_none(discord_id=discord_id)
+        if user_db is None:
+            return
 
-        team_emojis: list[int] = [match.team1.emoji, match.team2.emoji]
-        games_emojis: list[str] = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
-        games_emojis = games_emojis[math.floor(match.bestof / 2) : match.bestof]
+        # Only clear the pick if the user didn't already switch to another one
+        if team is not None:
+            await models.Prediction.filter(
+                match_id=match_id, user=user_db, team=team
+            ).update(team=0)
+        if games is not None:
+            await models.Prediction.filter(
+                match_id=match_id, user=user_db, games=games
+            ).update(games=0)
+
+        await models.Prediction.filter(
+            match_id=match_id, user=user_db, team=0, games=0
+        ).delete()
+
+    async def save_predictions(
+        self,
+        match_id: UUID,
+        picks: dict[int, tuple[int, int]],  # {discord id: (team, games)}
+        names: dict[int, str],  # {discord id: name}, of the (non-bot) users we know
+    ):
+        """Store the current predictions of a batch of users on an open match.
+
+        Users without a team and games pick lose their prediction.
+        """
+        users_db = await models.User.bulk_upsert(
+            {
+                discord_id: name
+                for discord_id, name in names.items()
+                if picks.get(discord_id, (0, 0)) != (0, 0)
+            }
+        )
+        unknown = [discord_id for discord_id in picks if discord_id not in users_db]
+        if unknown:
+            for user_db in await models.User.filter(discord_id__in=unknown):
+                users_db[user_db.discord_id] = user_db
+
+        # Users we don't know and can't create never had a prediction
+        picks = {k: v for k, v in picks.items() if k in users_db}
+        if not picks:
+            return
+
+        predictions = await models.Prediction.filter(
+            match_id=match_id, user_id__in=[u.id for u in users_db.values()]
+        )
+        predictions = {p.user_id: p for p in predictions}
+
+        to_delete: list[UUID] = []
+        to_create: list[models.Prediction] = []
+        async with in_transaction():
+            for discord_id, (team, games) in picks.items():
+                user_db = users_db[discord_id]
+                prediction = predictions.get(user_db.id)
+                if team == 0 and games == 0:
+                    if prediction is not None:
+                        to_delete.append(prediction.id)
+                elif prediction is None:
+                    to_create.append(
+                        models.Prediction(
+                            match_id=match_id, user=user_db, team=team, games=games
+                        )
+                    )
+                elif (prediction.team, prediction.games) != (team, games):
+                    await models.Prediction.filter(id=prediction.id).update(
+                        team=team, games=games
+                    )
+
+            if to_delete:
+                await models.Prediction.filter(id__in=to_delete).delete()
+            if to_create:
+                await models.Prediction.bulk_create(to_create)
+
+    async def process_reactions(
+        self, message_id: int, payloads: list[discord.RawReactionActionEvent]
+    ):
+        """Handle a batch of reaction events on a tracked match message.
+
+        Every user's reactions are collapsed into their final prediction, which is saved once,
+        and the reactions they replaced are removed in one go.
+        """
+        match = self.match_index.get_match(message_id)
+        if match is None:
+            return
+
+        removals: dict[int, set[EmojiKey]] = {}  # {user id: reactions to remove}
+        names: dict[int, str] = {}
+        for payload in payloads:
+            if match.parse_emoji(payload.emoji) == (None, None):
+                continue
+
+            user_removals = removals.setdefault(payload.user_id, set())
+            key = match.emoji_key(payload.emoji)
+            if payload.event_type == "REACTION_ADD":
+                if payload.member is not None and not payload.member.bot:
+                    names[payload.user_id] = payload.member.name
+                user_removals.update(match.select(payload.user_id, payload.emoji))
+            else:
+                match.deselect(payload.user_id, payload.emoji)
+            user_removals.discard(key)
 
-        # Create predictions
-        predictions: dict[discord.User, models.Prediction] = {}  # {User: Prediction}
+        if not removals:
+            return
+
+        picks = {user_id: match.prediction(user_id) for user_id in removals}
+        await self.save_predictions(match.match_id, picks, names)
+
+        channel_id = payloads[0].channel_id
+        message = self.messages.partial(channel_id, message_id)
+        coro_list = [
+            self.messages.request(
+                channel_id,
+                functools.partial(
+                    message.remove_reaction,
+                    self.client.get_emoji(key) if isinstance(key, int) else key,
+                    discord.Object(user_id),
+                ),
+                Priority.INTERACTIVE,
+            )
+            for user_id, keys in removals.items()
+            for key in keys
+        ]
+        await asyncio.gather(*coro_list, return_exceptions=True)
 
+    async def reconcile_predictions(self, match: models.Match):
+        """Rebuild the predictions of a match from the reactions on its message.
+
+        Used for matches whose reaction events may have been missed, e.g. while the bot was offline.
+        """
+        await match.fetch_related("tournament", "team1", "team2")
+
+        open_match = self.match_index.get_match(match.message)
+        if open_match is None:
+            open_match = OpenMatch.from_match(match)
+
+        # Reaction events that arrive while the reactions are read are queued
+        # and applied on top of what was read, instead of being overwritten by it
+        open_match.tracked = True
+        async with self.reaction_queue.hold(match.message):
+            try:
+                await self._read_reactions(match, open_match)
+            except Exception:
+                # The events are handled one by one again, the match is
+                # reconciled once more when it closes
+                open_match.tracked = False
+                self.reaction_queue.forget(match.message)
+                raise
+
+    async def _read_reactions(self, match: models.Match, open_match: OpenMatch):
+        """Save the predictions following from the reactions on the match message."""
+        # The reactions have to be current
+        message = await self.messages.fetch(match.tournament.channel, match.message)
+
+        # Stream the users of every reaction into one pick per user
+        picks: dict[int, tuple[int, int]] = {}  # {user id: (team, games)}
+        names: dict[int, str] = {}  # {user id: name}
+        selections: dict[int, set[EmojiKey]] = {}  # {user id: reactions}
         for reaction in message.reactions:
-            if reaction.custom_emoji and (reaction.emoji.id in team_emojis):
-                # Team prediction
-                team = team_emojis.index(reaction.emoji.id) + 1
-                users: list[discord.User] = await reaction.users().flatten()
-                for user in users:
-                    if user.bot == False:
-                        if user in predictions:
-                            predictions[user].team = team
-                        else:
-                            predictions[user] = models.Prediction(
-                                team=team, games=0, match=match
-                            )
-
-            if not reaction.custom_emoji and (reaction.emoji in games_emojis):
-                # Games prediction
-                games = games_emojis.index(reaction.emoji) + math.ceil(match.bestof / 2)
-                users: list[discord.User] = await reaction.users().flatten()
-                for user in users:
-                    if user.bot == False:
-                        if user in predictions:
-                            predictions[user].games = games
-                        else:
-                            predictions[user] = models.Prediction(
-                                team=0, games=games, match=match
-                            )
-
-        # Add db users to the predictions
-        discord_ids = {u.id for u in predictions}
-        users_db = await models.User.filter(discord_id__in=discord_ids)
-        users_db = {u.discord_id: u for u in users_db}
-
-        predictions_list: list[models.Prediction] = []
-        for user, prediction in predictions.items():
-            # Add or update user
-            if not ((user.id in users_db) and (users_db[user.id].name == user.name)):
-                new_user, _ = await models.User.update_or_create(
-                    {"name": user.name},
-                    discord_id=user.id,
+            team, games = open_match.parse_emoji(reaction.emoji)
+            if team is None and games is None:
+                continue
+
+            key = open_match.emoji_key(reaction.emoji)
+            async for user in reaction.users():
+                if user.bot:
+                    continue
+                names[user.id] = user.name
+                selections.setdefault(user.id, set()).add(key)
+                pick_team, pick_games = picks.get(user.id, (0, 0))
+                picks[user.id] = (
+                    pick_team if team is None else team,
+                    pick_games if games is None else games,
+                )
+
+        open_match.selections = selections
+
+        # Users who took their reactions off since lose their prediction
+        recorded = await models.Prediction.filter(match=match).values_list(
+            "user__discord_id", flat=True
+        )
+        for discord_id in recorded:
+            picks.setdefault(discord_id, (0, 0))
+
+        # Write the predictions in chunks, each in its own short transaction
+        items = list(picks.items())
+        for i in range(0, len(items), PREDICTION_CHUNK_SIZE):
+            chunk = dict(items[i : i + PREDICTION_CHUNK_SIZE])
+            await self.save_predictions(match.id, chunk, names)
+
+    async def sync_open_matches(self):
+        """Reconcile the predictions of all open matches and start recording them live."""
+        self.live_matches.clear()
+
+        matches = await self.match_index.load()
+
+        for match in matches:
+            try:
+                await self.resync_match(match)
+            except Exception:
+                logging.exception(
+                    f"Could not reconcile predictions of match {match.id}"
                 )
-                users_db[user.id] = new_user
 
-            prediction.user = users_db[user.id]
-            predictions_list.append(prediction)
+    async def resync_match(self, match: models.Match):
+        """Reconcile the predictions of an open match and record them live from then on."""
+        await self.reconcile_predictions(match)
+        self.live_matches.add(match.id)
+
+    async def close_match(self, match: models.Match, update_message=True):
+        # Safeguard
+        if match.running != models.MatchRunningEnum.RUNNING:
+            return
+
+        # Handle reactions that are still queued
+        await self.reaction_queue.flush(match.message)
+        self.reaction_queue.forget(match.message)
+
+        # Predictions are recorded from reaction events while the match is open,
+        # only scrape the reactions if we may have missed some
+        if match.id not in self.live_matches:
+            await self.reconcile_predictions(match)
+        self.live_matches.discard(match.id)
+        self.match_index.remove_match(match)
 
         # Close the match
         match.running = models.MatchRunningEnum.CLOSED
-
-        # Save changes to database
-        async with in_transaction():
-            await models.Prediction.bulk_create(predictions_list)
-            await match.save()
+        await match.save()
 
         if update_message:
             await self.update_match_message(match)
 
+    async def close_matches(
+        self, matches: list[models.Match], concurrency: int = CLOSE_CONCURRENCY
+    ):
+        """Close several matches at once, at most `concurrency` at the same time.
+
+        A match that fails to close is logged and doesn't stop the others.
+        discord.py waits out the rate limits of the edits itself.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def close(match: models.Match):
+            async with semaphore:
+                try:
+                    await self.close_match(match)
+                except Exception:
+                    logging.exception(f"Could not close match {match.id}")
+
+        await asyncio.gather(*[close(match) for match in matches])
+
+    def score_predictions(
+        self, match: models.Match, predictions: list[models.Prediction]
+    ) -> dict[models.User, tuple[int, bool]]:
+        return {
+            p.user: match.tournament.prediction_score(match, p.team, p.games)
+            for p in predictions
+        }
+
+    def update_score_index(
+        self,
+        match: models.Match,
+        scores: dict[models.User, tuple[int, bool]],
+        was_ended: bool,
+    ):
+        # Indexes that are being built now are outdated
+        self.score_generations[match.tournament_id] += 1
+
+        index = self.score_indexes.get(match.tournament_id)
+        if index is None:
+            return
+
+        if was_ended:
+            # The result of the match changed, rebuild the index when it's needed
+            self.score_indexes.pop(match.tournament_id)
+            return
+
+        for user, (score, correct) in scores.items():
+            index.add(user, score, correct)
+
+    async def update_guild_scores(
+        self,
+        match: models.Match,
+        scores: dict[models.User, tuple[int, bool]],
+        previous_scores: Optional[dict[models.User, tuple[int, bool]]] = None,
+    ):
+        """Add the scores of an ended match to the guild leaderboard.
+
+        If the match had already ended, previous_scores are the scores of its old result, which get replaced.
+        """
+        # {user id: (score, correct, total)}
+        deltas: dict[UUID, tuple[int, int, int]] = {}
+        for user, (score, correct) in scores.items():
+            if previous_scores is None:
+                deltas[user.id] = (score, int(correct), 1)
+            else:
+                previous_score, previous_correct = previous_scores[user]
+                deltas[user.id] = (
+                    score - previous_score,
+                    int(correct) - int(previous_correct),
+                    0,
+                )
+
+        deltas = {k: v for k, v in deltas.items() if any(v)}
+        if not deltas:
+            return
+
+        # Matches that ended before the guild scores existed are only part of
+        # them after a rebuild, which stores them on the null day
+        day = match.ended_at.date() if match.ended_at is not None else None
+        if day is None:
+            rebuilt = await models.GuildScore.filter(
+                guild=match.tournament.guild, day=None
+            ).exists()
+            if not rebuilt:
+                return
+
+        async with in_transaction():
+            await models.GuildScore.add_scores(match.tournament.guild, day, deltas)
+
+    async def rebuild_guild_scores(self, guild: int):
+        """Recompute the guild leaderboard from all ended matches in the guild."""
+        predictions = await models.Prediction.filter(
+            match__tournament__guild=guild,
+            match__running=models.MatchRunningEnum.ENDED,
+        ).select_related("match__tournament")
+
+        totals: dict[tuple, list[int]] = {}  # {(user id, day): [score, correct, total]}
+        for p in predictions:
+            match: models.Match = p.match
+            score, correct = match.tournament.prediction_score(match, p.team, p.games)
+            day = match.ended_at.date() if match.ended_at is not None else None
+            entry = totals.setdefault((p.user_id, day), [0, 0, 0])
+            entry[0] += score
+            entry[1] += int(correct)
+            entry[2] += 1
+
+        async with in_transaction():
+            await models.GuildScore.filter(guild=guild).delete()
+            await models.GuildScore.bulk_create(
+                [
+                    models.GuildScore(
+                        guild=guild,
+                        user_id=user_id,
+                        day=day,
+                        score=score,
+                        correct=correct,
+                        total=total,
+                    )
+                    for (user_id, day), (score, correct, total) in totals.items()
+                ]
+            )
+
     async def end_match(
         self, match: models.Match, team: int, games: int, update_tournament_message=True
     ):
         if match.running == models.MatchRunningEnum.RUNNING:
             await self.close_match(match, update_message=False)
 
-        await match.fetch_related("tournament")
+        await match.fetch_missing_related("tournament")
+
+        was_ended = match.running == models.MatchRunningEnum.ENDED
+
+        predictions = await models.Prediction.filter(match=match).select_related("user")
+        previous_scores = None
+        if was_ended:
+            previous_scores = self.score_predictions(match, predictions)
 
         match.running = models.MatchRunningEnum.ENDED
         match.games = games
         match.result = team
+        if not was_ended:
+            match.ended_at = datetime.now(tz=timezone.utc)
 
         await match.save()
+        self.match_index.remove_match(match)
+
+        # The index has to be updated before anything else can read the saved match
+        scores = self.score_predictions(match, predictions)
+        self.update_score_index(match, scores, was_ended)
+        await self.update_guild_scores(match, scores, previous_scores)
 
-        channel: discord.TextChannel = self.client.get_channel(match.tournament.channel)
         await self.update_match_message(match)
 
         if update_tournament_message:
-            tournament_message: discord.Message = await channel.fetch_message(
-                match.tournament.message
-            )
-            new_content = await self.generate_tournament_text(match.tournament)
-            await tournament_message.edit(content=new_content)
+            self.schedule_tournament_message_update(match.tournament)
 
         # Send update message if necesary
         if match.tournament.updates_channel is not None:
             channel = self.client.get_channel(match.tournament.updates_channel)
 
-            # Fetch predictions
-            # await match.fetch_related("predictions")
-
-            leaderboard: list[models.ScoreboardEntry]
-            leaderboard = await match.tournament.calculate_leaderboard()
-            leaderboard_dict = {se.user: se for se in leaderboard}
+            # The score index already holds the scores of this match, the
+            # winners are among the predictions loaded above
+            index = await self.get_score_index(match.tournament)
+            entries = {
+                p.user.discord_id: index.entry(p.user.discord_id) for p in predictions
+            }
+            if None in entries.values():
+                # The index doesn't hold this match, read the scores from the database
+                leaderboard = await match.tournament.calculate_leaderboard()
+                entries = {se.user.discord_id: se for se in leaderboard}
 
-            winners_team: list[models.Prediction] = await models.Prediction.filter(
-                match=match, team=match.result
-            ).select_related("user")
             team_winners = [
-                (p.user.name, leaderboard_dict[p.user].score) for p in winners_team
+                (p.user.name, entries[p.user.discord_id].score)
+                for p in predictions
+                if p.team == match.result
             ]
             team_winners.sort(key=lambda x: x[0])
 
             game_winners = []
             if match.bestof > 1:
-                winners_games: list[models.Prediction] = await models.Prediction.filter(
-                    match=match, games=match.games
-                ).select_related("user")
                 game_winners = [
-                    (p.user.name, leaderboard_dict[p.user].score) for p in winners_games
+                    (p.user.name, entries[p.user.discord_id].score)
+                    for p in predictions
+                    if p.games == match.games
                 ]
                 game_winners.sort()
 
@@ -492,7 +1100,9 @@ class TournamentManager:
                 match, team_winners, game_winners
             )
             for embed in embeds:
-                await channel.send(embed=embed)
+                await self.messages.request(
+                    channel.id, functools.partial(channel.send, embed=embed)
+                )
 
             tab_running_match_count = await models.Match.filter(
                 tournament=match.tournament,
@@ -505,4 +1115,6 @@ class TournamentManager:
                     match.tournament,
                     [match.fandom_tab],
                 )
-                await channel.send(content)
+                await self.messages.request(
+                    channel.id, functools.partial(channel.send, content)
+                )
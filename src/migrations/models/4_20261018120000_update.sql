@@ -0,0 +1,16 @@
+-- upgrade --
+ALTER TABLE "match" ADD "ended_at" TIMESTAMPTZ;
+CREATE TABLE IF NOT EXISTS "guild_score" (
+    "id" UUID NOT NULL  PRIMARY KEY,
+    "guild" BIGINT NOT NULL,
+    "day" DATE,
+    "score" INT NOT NULL  DEFAULT 0,
+    "correct" INT NOT NULL  DEFAULT 0,
+    "total" INT NOT NULL  DEFAULT 0,
+    "user_id" UUID NOT NULL REFERENCES "user" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_guild_score_guild_22c7a6" UNIQUE ("guild", "day", "user_id")
+);
+COMMENT ON TABLE "guild_score" IS 'Scores of a user in all tournaments of a guild, summed per day matches ended on.';
+-- downgrade --
+ALTER TABLE "match" DROP COLUMN "ended_at";
+DROP TABLE IF EXISTS "guild_score";
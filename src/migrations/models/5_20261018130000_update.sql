@@ -0,0 +1,11 @@
+-- upgrade --
+CREATE TABLE IF NOT EXISTS "leaderboard_snapshot" (
+    "id" UUID NOT NULL  PRIMARY KEY,
+    "tab" TEXT,
+    "entries" JSONB NOT NULL,
+    "tournament_id" UUID NOT NULL REFERENCES "tournament" ("id") ON DELETE CASCADE,
+    CONSTRAINT "uid_leaderboard_tournam_6ad8ee" UNIQUE ("tournament_id", "tab")
+);
+COMMENT ON TABLE "leaderboard_snapshot" IS 'Final standings of an ended tournament, either overall (no tab) or for one tab.';
+-- downgrade --
+DROP TABLE IF EXISTS "leaderboard_snapshot";
@@ -0,0 +1,9 @@
+-- upgrade --
+CREATE TABLE IF NOT EXISTS "emoji_colour" (
+    "id" UUID NOT NULL  PRIMARY KEY,
+    "emoji" BIGINT NOT NULL UNIQUE,
+    "colour" INT NOT NULL
+);
+COMMENT ON TABLE "emoji_colour" IS 'Dominant colour of a custom emoji, used for the result embeds of its team.';
+-- downgrade --
+DROP TABLE IF EXISTS "emoji_colour";
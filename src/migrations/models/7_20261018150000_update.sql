@@ -0,0 +1,9 @@
+-- upgrade --
+CREATE TABLE IF NOT EXISTS "match_end_dialog" (
+    "id" UUID NOT NULL  PRIMARY KEY,
+    "message" BIGINT NOT NULL UNIQUE,
+    "match_id" UUID NOT NULL UNIQUE REFERENCES "match" ("id") ON DELETE CASCADE
+);
+COMMENT ON TABLE "match_end_dialog" IS 'Message asking for the result of a match, open until the match is ended through it.';
+-- downgrade --
+DROP TABLE IF EXISTS "match_end_dialog";
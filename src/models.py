@@ -1,12 +1,17 @@
+import datetime
 import math
 from dataclasses import dataclass
 from enum import IntEnum
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from tortoise import fields
+from tortoise.expressions import F
+from tortoise.functions import Sum
 from tortoise.models import Model
 
+UPSERT_MAX_PARAMETERS = 999  # Parameters per statement, SQLite allows 999 at least
+
 
 class TournamentRunningEnum(IntEnum):
     ENDED = 0
@@ -34,12 +39,68 @@ class ScoreboardEntry:
         return f"{self.user.name} = Score: {self.score} - Correct: {self.correct} - Total: {self.total} ({self.percentage:.1f}%)"
 
 
+def _sqlite_value(value):
+    # SQLite stores uuids and dates as text
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
 class UUIDPrimaryKeyModel(Model):
     id = fields.UUIDField(pk=True)
 
     class Meta:
         abstract = True
 
+    async def fetch_missing_related(self, *related: str):
+        """Like fetch_related, but skips the relations that are already loaded."""
+        missing = [r for r in related if not isinstance(getattr(self, r), Model)]
+        if missing:
+            await self.fetch_related(*missing)
+
+    @classmethod
+    async def _upsert(
+        cls, columns: list[str], rows: list[tuple], conflict: list[str], update: str
+    ) -> bool:
+        """Insert the rows, running the `update` SET clause for rows that conflict.
+
+        On Postgres and SQLite every chunk of rows is a single INSERT ... ON CONFLICT
+        statement. Returns false without writing on other databases, callers fall
+        back to the ORM there. Conflicts are never detected on null columns.
+        """
+        db = cls._meta.db
+        dialect = db.capabilities.dialect
+        if dialect not in ("postgres", "sqlite"):
+            return False
+
+        columns = ["id", *columns]
+        sql = (
+            f'INSERT INTO "{cls._meta.db_table}" ('
+            + ", ".join(f'"{c}"' for c in columns)
+            + ") VALUES {} ON CONFLICT ("
+            + ", ".join(f'"{c}"' for c in conflict)
+            + f") DO UPDATE SET {update}"
+        )
+        chunk_size = UPSERT_MAX_PARAMETERS // len(columns)
+        for i in range(0, len(rows), chunk_size):
+            chunk = [(uuid4(), *row) for row in rows[i : i + chunk_size]]
+            if dialect == "postgres":
+                placeholders = iter(range(1, len(chunk) * len(columns) + 1))
+                values = ", ".join(
+                    "(" + ", ".join(f"${next(placeholders)}" for _ in columns) + ")"
+                    for _ in chunk
+                )
+                params = [v for row in chunk for v in row]
+            else:
+                values = ", ".join(
+                    "(" + ", ".join("?" for _ in columns) + ")" for _ in chunk
+                )
+                params = [_sqlite_value(v) for row in chunk for v in row]
+            await db.execute_query(sql.format(values), params)
+        return True
+
 
 class Team(UUIDPrimaryKeyModel):
     name = fields.TextField()
@@ -89,6 +150,52 @@ class Tournament(UUIDPrimaryKeyModel):
     def is_fandom(self) -> bool:
         return self.fandom_overview_page is not None
 
+    @property
+    def team_score_table(self) -> dict[int, int]:
+        return {
+            1: self.score_bo1_team,
+            3: self.score_bo3_team,
+            5: self.score_bo5_team,
+        }
+
+    @property
+    def games_score_table(self) -> dict[int, int]:
+        return {
+            3: self.score_bo3_games,
+            5: self.score_bo5_games,
+        }
+
+    def prediction_score(
+        self, match: "Match", team: int, games: int
+    ) -> tuple[int, bool]:
+        """Return the points a prediction earns on an ended match, and whether the team was correct."""
+        score = 0
+        correct = match.result == team
+
+        if correct:
+            score += self.team_score_table[match.bestof]
+
+        if match.games == games:
+            score += self.games_score_table[match.bestof]
+
+        return score, correct
+
+    @classmethod
+    async def unique_name(cls, name: str, guild: int) -> str:
+        """Return the name, or the name with the first free number behind it if it's taken in the guild."""
+        taken = set(
+            await cls.filter(guild=guild, name__startswith=name).values_list(
+                "name", flat=True
+            )
+        )
+        if name not in taken:
+            return name
+
+        i = 1
+        while f"{name} ({i})" in taken:
+            i += 1
+        return f"{name} ({i})"
+
     async def calculate_leaderboard(
         self,
         tabs: Optional[list[str]] = None,
@@ -113,16 +220,6 @@ class Tournament(UUIDPrimaryKeyModel):
             match_id__in=matches,
         ).select_related("match", "user")
 
-        team_score_table = {
-            1: self.score_bo1_team,
-            3: self.score_bo3_team,
-            5: self.score_bo5_team,
-        }
-        games_score_table = {
-            3: self.score_bo3_games,
-            5: self.score_bo5_games,
-        }
-
         for p in predictions:
             # Add user to scores if not already in it
             if p.user not in scores:
@@ -131,14 +228,11 @@ class Tournament(UUIDPrimaryKeyModel):
             se: ScoreboardEntry = scores[p.user]
 
             # Update dictionary
+            score, correct = self.prediction_score(p.match, p.team, p.games)
             se.total += 1
-
-            if p.match.result == p.team:  # type: ignore
+            se.score += score
+            if correct:
                 se.correct += 1
-                se.score += team_score_table[p.match.bestof]
-
-            if p.match.games == p.games:  # type: ignore
-                se.score += games_score_table[p.match.bestof]
 
         leaderboard = list(scores.values())
         leaderboard.sort(key=lambda entry: entry.user.name)
@@ -177,6 +271,8 @@ class Match(UUIDPrimaryKeyModel):
     fandom_tab = fields.TextField(null=True)
     fandom_initialn_matchintab = fields.SmallIntField(null=True)
 
+    ended_at = fields.DatetimeField(null=True)
+
     users: fields.ManyToManyRelation["User"] = fields.ManyToManyField(
         "models.User",
         through=Prediction.Meta.table,
@@ -214,6 +310,16 @@ class Match(UUIDPrimaryKeyModel):
         return self.name
 
 
+class MatchEndDialog(UUIDPrimaryKeyModel):
+    """Message asking for the result of a match, open until the match is ended through it."""
+
+    message = fields.BigIntField(unique=True)
+    match = fields.OneToOneField("models.Match", related_name="end_dialog")
+
+    class Meta:
+        table = "match_end_dialog"
+
+
 class User(UUIDPrimaryKeyModel):
     discord_id = fields.BigIntField(unique=True)
     name = fields.TextField()
@@ -226,3 +332,195 @@ class User(UUIDPrimaryKeyModel):
 
     def __str__(self):
         return self.name
+
+    @classmethod
+    async def bulk_upsert(cls, names: dict[int, str]) -> dict[int, "User"]:
+        """Create or rename the users in {discord id: name}, return them by discord id."""
+        upserted = await cls._upsert(
+            ["discord_id", "name"],
+            list(names.items()),
+            ["discord_id"],
+            '"name" = excluded."name"',
+        )
+        if not upserted:
+            missing = dict(names)
+            for user in await cls.filter(discord_id__in=list(missing)):
+                name = missing.pop(user.discord_id)
+                if user.name != name:
+                    await cls.filter(id=user.id).update(name=name)
+            await cls.bulk_create(
+                [cls(discord_id=d, name=n) for d, n in missing.items()]
+            )
+
+        # RETURNING needs SQLite 3.35, read the users back instead
+        users: dict[int, User] = {}
+        discord_ids = list(names)
+        for i in range(0, len(discord_ids), UPSERT_MAX_PARAMETERS):
+            chunk = discord_ids[i : i + UPSERT_MAX_PARAMETERS]
+            for user in await cls.filter(discord_id__in=chunk):
+                users[user.discord_id] = user
+        return users
+
+
+class LeaderboardSnapshot(UUIDPrimaryKeyModel):
+    """Final standings of an ended tournament, either overall (no tab) or for one tab."""
+
+    tournament = fields.ForeignKeyField(
+        "models.Tournament", related_name="leaderboard_snapshots"
+    )
+    tab = fields.TextField(null=True)
+    entries = fields.JSONField()
+
+    @classmethod
+    def from_leaderboard(
+        cls,
+        tournament: Tournament,
+        leaderboard: list[ScoreboardEntry],
+        tab: Optional[str] = None,
+    ) -> "LeaderboardSnapshot":
+        entries = [
+            {
+                "user": str(entry.user.id),
+                "discord_id": entry.user.discord_id,
+                "name": entry.user.name,
+                "score": entry.score,
+                "correct": entry.correct,
+                "total": entry.total,
+            }
+            for entry in leaderboard
+        ]
+        return cls(tournament=tournament, tab=tab, entries=entries)
+
+    @property
+    def leaderboard(self) -> list[ScoreboardEntry]:
+        return [
+            ScoreboardEntry(
+                User(id=UUID(e["user"]), discord_id=e["discord_id"], name=e["name"]),
+                score=e["score"],
+                correct=e["correct"],
+                total=e["total"],
+            )
+            for e in self.entries
+        ]
+
+    class Meta:
+        table = "leaderboard_snapshot"
+        unique_together = (("tournament", "tab"),)
+
+
+class GuildScore(UUIDPrimaryKeyModel):
+    """Scores of a user in all tournaments of a guild, summed per day matches ended on.
+
+    Matches that ended before this table existed are stored with a null day.
+    """
+
+    guild = fields.BigIntField()
+    user = fields.ForeignKeyField("models.User", related_name="guild_scores")
+    day = fields.DateField(null=True)
+
+    score = fields.IntField(default=0)
+    correct = fields.IntField(default=0)
+    total = fields.IntField(default=0)
+
+    @classmethod
+    async def add_scores(
+        cls,
+        guild: int,
+        day: Optional[datetime.date],
+        deltas: dict[UUID, tuple[int, int, int]],
+    ):
+        """Add {user id: (score, correct, total)} to the users' rows of a day, creating missing rows.
+
+        Concurrent calls for the same day don't conflict, except for the null day.
+        """
+        if day is not None:
+            upserted = await cls._upsert(
+                ["guild", "day", "user_id", "score", "correct", "total"],
+                [(guild, day, user_id, *delta) for user_id, delta in deltas.items()],
+                ["guild", "day", "user_id"],
+                '"score" = "guild_score"."score" + excluded."score", '
+                '"correct" = "guild_score"."correct" + excluded."correct", '
+                '"total" = "guild_score"."total" + excluded."total"',
+            )
+            if upserted:
+                return
+
+        deltas = dict(deltas)
+        for row in await cls.filter(guild=guild, day=day, user_id__in=list(deltas)):
+            score, correct, total = deltas.pop(row.user_id)
+            await cls.filter(id=row.id).update(
+                score=F("score") + score,
+                correct=F("correct") + correct,
+                total=F("total") + total,
+            )
+        await cls.bulk_create(
+            [
+                cls(
+                    guild=guild,
+                    user_id=user_id,
+                    day=day,
+                    score=score,
+                    correct=correct,
+                    total=total,
+                )
+                for user_id, (score, correct, total) in deltas.items()
+            ]
+        )
+
+    @classmethod
+    async def calculate_leaderboard(
+        cls,
+        guild: int,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> list[ScoreboardEntry]:
+        query = cls.filter(guild=guild)
+        if start is not None:
+            query = query.filter(day__gte=start)
+        if end is not None:
+            query = query.filter(day__lte=end)
+
+        rows = (
+            await query.annotate(
+                score_sum=Sum("score"),
+                correct_sum=Sum("correct"),
+                total_sum=Sum("total"),
+            )
+            .group_by("user__discord_id", "user__name")
+            .values(
+                "user__discord_id",
+                "user__name",
+                "score_sum",
+                "correct_sum",
+                "total_sum",
+            )
+        )
+
+        leaderboard = [
+            ScoreboardEntry(
+                User(discord_id=row["user__discord_id"], name=row["user__name"]),
+                score=row["score_sum"],
+                correct=row["correct_sum"],
+                total=row["total_sum"],
+            )
+            for row in rows
+            if row["total_sum"] > 0
+        ]
+        leaderboard.sort(key=lambda entry: entry.user.name)
+        leaderboard.sort(key=lambda entry: entry.score, reverse=True)
+
+        return leaderboard
+
+    class Meta:
+        table = "guild_score"
+        unique_together = (("guild", "day", "user"),)
+
+
+class EmojiColour(UUIDPrimaryKeyModel):
+    """Dominant colour of a custom emoji, used for the result embeds of its team."""
+
+    emoji = fields.BigIntField(unique=True)
+    colour = fields.IntField()  # 0xRRGGBB
+
+    class Meta:
+        table = "emoji_colour"
@@ -1,42 +1,103 @@
 import inspect
 import re
+from typing import Any, Awaitable, Callable, Union, get_args, get_origin
 
 from discord.ext import commands
 
+Converter = Callable[[commands.Context, str], Awaitable[Any]]
+
+
+def _identity_converter():
+    async def convert(ctx, argument):
+        return argument
+
+    return convert
+
+
+def _callable_converter(function):
+    if inspect.iscoroutinefunction(function):
+
+        async def convert(ctx, argument):
+            return await function(argument)
+
+    else:
+
+        async def convert(ctx, argument):
+            return function(argument)
+
+    return convert
+
+
+def _resolve_converter(parameter: inspect.Parameter) -> Converter:
+    """Return how to convert an argument for the parameter, based on its annotation."""
+    annotation = parameter.annotation
+    if get_origin(annotation) is Union:
+        # Optional[X], the argument is None when its group did not match
+        types = [t for t in get_args(annotation) if t is not type(None)]
+        if len(types) == 1:
+            annotation = types[0]
+    if annotation == inspect.Parameter.empty:
+        return _identity_converter()
+    if isinstance(annotation, commands.Converter):
+        # Converter object
+        return annotation.convert
+    if inspect.isclass(annotation) and issubclass(annotation, commands.Converter):
+        # Converter class
+        return annotation().convert
+    if callable(annotation) and not get_origin(annotation):
+        return _callable_converter(annotation)
+    raise TypeError(f"Cannot convert arguments for parameter {parameter.name}")
+
 
 # TODO: Improve when discordpy v2.0 releases with the run_conversion function
-def regex_arguments(pattern):
+def regex_arguments(pattern: str):
+    """Parse the arguments of a command with a regex instead of splitting on spaces.
+
+    Named groups are passed to the parameter with the same name, otherwise the
+    groups are passed to the parameters after the context in order. Arguments are
+    converted according to the parameter's annotation. An optional group that did
+    not match leaves the parameter at its default, or passes None without one.
+    The pattern and the conversions are resolved once, when the command is defined.
+    """
+    regex = re.compile(pattern)
+
     def decorator(function):
+        parameters = list(inspect.signature(function).parameters.values())[2:]
+        if regex.groupindex:
+            by_name = {p.name: p for p in parameters}
+            unknown = set(regex.groupindex) - set(by_name)
+            if unknown:
+                raise TypeError(f"Groups without a parameter: {', '.join(unknown)}")
+            groups: list[Union[str, int]] = list(regex.groupindex)
+            parameters = [by_name[name] for name in groups]
+        else:
+            groups = list(range(1, regex.groups + 1))
+            parameters = parameters[: regex.groups]
+
+        # (group, parameter name, converter, whether the parameter has a default)
+        pipeline = [
+            (
+                group,
+                parameter.name,
+                _resolve_converter(parameter),
+                parameter.default != inspect.Parameter.empty,
+            )
+            for group, parameter in zip(groups, parameters)
+        ]
+
         async def wrapper(self, ctx, *, args: str):
-            match = re.match(pattern, args.strip())
+            match = regex.match(args.strip())
             if match is None:
                 raise commands.UserInputError()
-            arg_groups = [self, ctx] + list(match.groups())
-            arg_converted = []
-            signature = inspect.signature(function)
-            for parameter, argument in zip(signature.parameters.values(), arg_groups):
-                if parameter.annotation == inspect.Parameter.empty:
-                    arg_converted.append(argument)
-                elif isinstance(parameter.annotation, commands.Converter):
-                    # Converter object
-                    arg_converted.append(
-                        await parameter.annotation.convert(ctx, argument),
-                    )
-                elif inspect.isclass(parameter.annotation) and issubclass(
-                    parameter.annotation,
-                    commands.Converter,
-                ):
-                    # Converter class
-                    arg_converted.append(
-                        await parameter.annotation().convert(ctx, argument),
-                    )
-                elif inspect.iscoroutine(parameter.annotation):
-                    arg_converted.append(await parameter.annotation(argument))
-                elif callable(parameter.annotation):
-                    arg_converted.append(parameter.annotation(argument))
-                else:
-                    raise commands.UserInputError()
-            await function(*arg_converted)
+
+            kwargs = {}
+            for group, name, convert, has_default in pipeline:
+                argument = match.group(group)
+                if argument is not None:
+                    kwargs[name] = await convert(ctx, argument)
+                elif not has_default:
+                    kwargs[name] = None
+            await function(self, ctx, **kwargs)
 
         return wrapper
 
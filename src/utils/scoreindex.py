@@ -0,0 +1,96 @@
+import bisect
+from typing import Iterable, Iterator, Optional
+
+from src import models
+
+ScoreKey = tuple[int, str, int]  # (-score, name, discord id)
+
+
+def rank_entries(
+    leaderboard: Iterable[models.ScoreboardEntry],
+) -> Iterator[tuple[int, models.ScoreboardEntry]]:
+    """Yield (rank, entry) for a sorted leaderboard. Tied scores share the rank of the first of them."""
+    rank = 0
+    prev_score = None
+    for i, entry in enumerate(leaderboard, start=1):
+        if entry.score != prev_score:
+            prev_score = entry.score
+            rank = i
+        yield rank, entry
+
+
+class ScoreIndex:
+    """Leaderboard of a single tournament kept sorted by (score, name).
+
+    Ranks are found with a binary search instead of rebuilding the whole
+    leaderboard, and entries can be updated one user at a time.
+    """
+
+    _keys: list[ScoreKey]
+    _entries: dict[int, models.ScoreboardEntry]  # {discord id: entry}
+
+    def __init__(self, leaderboard: Iterable[models.ScoreboardEntry] = ()):
+        self._entries = {entry.user.discord_id: entry for entry in leaderboard}
+        self._keys = sorted(self._key(entry) for entry in self._entries.values())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, discord_id: int):
+        return discord_id in self._entries
+
+    @staticmethod
+    def _key(entry: models.ScoreboardEntry) -> ScoreKey:
+        return (-entry.score, entry.user.name, entry.user.discord_id)
+
+    def _remove_key(self, key: ScoreKey):
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def add(self, user: "models.User", score: int, correct: bool):
+        """Add the result of one prediction by this user."""
+        entry = self._entries.get(user.discord_id)
+        if entry is None:
+            entry = models.ScoreboardEntry(user)
+            self._entries[user.discord_id] = entry
+        else:
+            self._remove_key(self._key(entry))
+            entry.user = user
+
+        entry.total += 1
+        entry.score += score
+        if correct:
+            entry.correct += 1
+
+        bisect.insort(self._keys, self._key(entry))
+
+    def entry(self, discord_id: int) -> Optional[models.ScoreboardEntry]:
+        return self._entries.get(discord_id)
+
+    def rank_of_score(self, score: int) -> int:
+        # Number of entries with a strictly higher score, plus one
+        return bisect.bisect_left(self._keys, (-score,)) + 1
+
+    def rank(self, discord_id: int) -> Optional[int]:
+        entry = self._entries.get(discord_id)
+        if entry is None:
+            return None
+        return self.rank_of_score(entry.score)
+
+    def neighbours(
+        self, discord_id: int, count: int = 1
+    ) -> list[tuple[int, models.ScoreboardEntry]]:
+        """Return (rank, entry) for this user and up to `count` entries above and below."""
+        entry = self._entries.get(discord_id)
+        if entry is None:
+            return []
+
+        i = bisect.bisect_left(self._keys, self._key(entry))
+        keys = self._keys[max(i - count, 0) : i + count + 1]
+
+        ranked = []
+        for key in keys:
+            neighbour = self._entries[key[2]]
+            ranked.append((self.rank_of_score(neighbour.score), neighbour))
+        return ranked
@@ -0,0 +1,67 @@
+import asyncio
+from typing import Awaitable, Callable
+
+import pytest
+from tortoise import Tortoise
+from tortoise.backends.sqlite.client import SqliteClient, TransactionWrapper
+
+EXECUTE_METHODS = [
+    "execute_insert",
+    "execute_many",
+    "execute_query",
+    "execute_query_dict",
+    "execute_script",
+]
+
+
+class QueryCounter:
+    """Records the queries sent to the database, inside transactions or not."""
+
+    queries: list[str]
+
+    def __init__(self):
+        self.queries = []
+
+    def __len__(self):
+        return len(self.queries)
+
+    def clear(self):
+        self.queries.clear()
+
+    def wrap(self, method):
+        async def execute(client, query, *args, **kwargs):
+            self.queries.append(query)
+            return await method(client, query, *args, **kwargs)
+
+        return execute
+
+
+@pytest.fixture
+def run() -> Callable[[Callable[[], Awaitable]], object]:
+    """Run a coroutine function against a new in-memory database."""
+
+    def run(main: Callable[[], Awaitable]):
+        async def wrapper():
+            await Tortoise.init(
+                db_url="sqlite://:memory:", modules={"models": ["src.models"]}
+            )
+            await Tortoise.generate_schemas()
+            try:
+                return await main()
+            finally:
+                await Tortoise.close_connections()
+
+        return asyncio.run(wrapper())
+
+    return run
+
+
+@pytest.fixture
+def queries(monkeypatch) -> QueryCounter:
+    counter = QueryCounter()
+    for cls in (SqliteClient, TransactionWrapper):
+        for name in EXECUTE_METHODS:
+            # Methods the transaction wrapper inherits are counted once
+            if name in vars(cls):
+                monkeypatch.setattr(cls, name, counter.wrap(vars(cls)[name]))
+    return counter
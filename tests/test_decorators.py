@@ -0,0 +1,58 @@
+import asyncio
+from typing import Optional
+
+import pytest
+from discord.ext import commands
+
+from src.utils import decorators
+
+
+class Upper(commands.Converter):
+    async def convert(self, ctx, argument):
+        return argument.upper()
+
+
+def call(command, args: str):
+    calls = []
+
+    async def main():
+        await command(calls, None, args=args)
+
+    asyncio.run(main())
+    return calls[0]
+
+
+def test_positional_groups():
+    @decorators.regex_arguments("(.+) (\\S+) (\\S+)")
+    async def command(calls, ctx, name, code: Upper, bestof: int):
+        calls.append((name, code, bestof))
+
+    assert call(command, " Week 1 Match 2 g2 3 ") == ("Week 1 Match 2", "G2", 3)
+
+
+def test_named_and_optional_groups():
+    @decorators.regex_arguments(
+        r"(?P<code>\w+)(?: (?P<bestof>\d))?(?: #(?P<tag>\w+))?$"
+    )
+    async def command(calls, ctx, tag: Optional[str], code: str, bestof: int = 1):
+        calls.append((code, bestof, tag))
+
+    assert call(command, "g2") == ("g2", 1, None)
+    assert call(command, "g2 5 #x") == ("g2", 5, "x")
+
+
+def test_no_match_is_user_input_error():
+    @decorators.regex_arguments(r"(?P<ids>\d+)$")
+    async def command(calls, ctx, ids: int):
+        calls.append(ids)
+
+    with pytest.raises(commands.UserInputError):
+        call(command, "abc")
+
+
+def test_group_without_parameter_fails_at_definition():
+    with pytest.raises(TypeError):
+
+        @decorators.regex_arguments(r"(?P<missing>\d+)")
+        async def command(calls, ctx, ids: int):
+            pass
@@ -0,0 +1,51 @@
+import asyncio
+
+from src import models
+from src.managers.matchindex import MatchIndex
+
+
+async def create_open_match() -> models.Match:
+    tournament = await models.Tournament.create(
+        name="Worlds", guild=1, channel=2, message=3, running=1
+    )
+    team1 = await models.Team.create(name="G2", code="G2", emoji=11, guild=1)
+    team2 = await models.Team.create(name="FNC", code="FNC", emoji=22, guild=1)
+    return await models.Match.create(
+        name="Match 1",
+        tournament=tournament,
+        team1=team1,
+        team2=team2,
+        bestof=3,
+        id_in_tournament=1,
+        message=101,
+        running=models.MatchRunningEnum.RUNNING,
+    )
+
+
+def test_concurrent_loads_share_one_load(run, queries):
+    async def main():
+        await create_open_match()
+        index = MatchIndex()
+
+        queries.clear()
+        # A burst of reactions before the index is loaded
+        await asyncio.gather(*[index.load() for _ in range(20)])
+        return index
+
+    index = run(main)
+    # The open matches and the dialogs
+    assert len(queries) == 2
+    assert index.loaded and list(index.matches) == [101]
+
+
+def test_load_keeps_tracked_matches(run):
+    async def main():
+        await create_open_match()
+        index = MatchIndex()
+        await index.load()
+        index.get_match(101).tracked = True
+
+        await index.load()
+        return index
+
+    assert run(main).get_match(101).tracked
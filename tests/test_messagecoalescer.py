@@ -0,0 +1,76 @@
+import asyncio
+
+import discord
+import pytest
+
+from src.managers.messagecoalescer import MessageCoalescer
+
+
+class FakeMessages:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.edits = []
+
+    async def edit(self, channel_id, message_id, **fields):
+        if self.fail:
+            raise discord.HTTPException(FakeResponse(), "edit failed")
+        self.edits.append((message_id, fields["content"]))
+
+
+class FakeResponse:
+    status = 500
+    reason = "Internal Server Error"
+
+
+def renderer(content: str):
+    async def render():
+        return content
+
+    return render
+
+
+def test_scheduled_edits_are_coalesced():
+    async def main():
+        messages = FakeMessages()
+        coalescer = MessageCoalescer(messages, window=0.01)
+        for content in ["a", "b", "c"]:
+            coalescer.mark_dirty(1, 10, renderer(content))
+        await asyncio.sleep(0.05)
+
+        # Same content again, no edit
+        coalescer.mark_dirty(1, 10, renderer("c"))
+        await asyncio.sleep(0.05)
+        return messages, coalescer
+
+    messages, coalescer = asyncio.run(main())
+    assert messages.edits == [(10, "c")]
+    assert not coalescer._locks and not coalescer._tasks and not coalescer.pending
+
+
+def test_edit_now_raises_when_the_edit_fails():
+    async def main():
+        messages = FakeMessages(fail=True)
+        coalescer = MessageCoalescer(messages)
+        with pytest.raises(discord.HTTPException):
+            await coalescer.edit_now(1, 10, renderer("a"))
+
+        # The failed edit is retried even though the content is the same
+        messages.fail = False
+        await coalescer.edit_now(1, 10, renderer("a"))
+        return messages, coalescer
+
+    messages, coalescer = asyncio.run(main())
+    assert messages.edits == [(10, "a")]
+    assert not coalescer._locks
+
+
+def test_contents_are_bounded():
+    async def main():
+        messages = FakeMessages()
+        coalescer = MessageCoalescer(messages, max_contents=3)
+        for message_id in range(10):
+            await coalescer.edit_now(1, message_id, renderer("a"))
+        return coalescer
+
+    coalescer = asyncio.run(main())
+    assert list(coalescer._contents) == [7, 8, 9]
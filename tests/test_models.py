@@ -0,0 +1,42 @@
+from src import models
+
+
+def test_unique_name_with_many_collisions(run, queries):
+    async def create(name: str, guild: int = 1):
+        await models.Tournament.create(
+            name=name, guild=guild, channel=2, message=3, running=0
+        )
+
+    async def main():
+        names = {}
+
+        base = "LCK 100%_Summer"
+        await create(base)
+        for i in range(1, 501):
+            if i != 317:
+                await create(f"{base} ({i})")
+        # Names the wildcards in the base name would match
+        await create("LCK 100% Summer (317)")
+        await create("LCK 100XYSummer (317)")
+        # Other guilds don't count
+        await create("Worlds", guild=2)
+
+        queries.clear()
+        names["gap"] = await models.Tournament.unique_name(base, 1)
+        names["queries"] = len(queries)
+
+        await create(f"{base} (317)")
+        names["full"] = await models.Tournament.unique_name(base, 1)
+        names["free"] = await models.Tournament.unique_name("LCK Spring", 1)
+        names["other guild"] = await models.Tournament.unique_name("Worlds", 1)
+
+        return names
+
+    names = run(main)
+    assert names == {
+        "gap": "LCK 100%_Summer (317)",
+        "queries": 1,
+        "full": "LCK 100%_Summer (501)",
+        "free": "LCK Spring",
+        "other guild": "Worlds",
+    }
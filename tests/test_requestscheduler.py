@@ -0,0 +1,112 @@
+import asyncio
+
+from src.managers.requestscheduler import Priority, RequestScheduler
+
+
+def test_interactive_slot_is_reserved():
+    async def main():
+        scheduler = RequestScheduler(concurrency=4, reserved=1, guild_limit=4)
+        blocked = asyncio.Event()
+        started = []
+
+        async def stalled(name):
+            started.append(name)
+            await blocked.wait()
+
+        async def interactive():
+            started.append("interactive")
+
+        # Requests of one guild waiting on a rate limit
+        background = [
+            asyncio.create_task(scheduler.run(lambda i=i: stalled(i), 1, Priority.BULK))
+            for i in range(5)
+        ]
+        await asyncio.sleep(0)
+        await asyncio.wait_for(scheduler.run(interactive, 2, Priority.INTERACTIVE), 1)
+
+        blocked.set()
+        await asyncio.gather(*background)
+        return started
+
+    started = asyncio.run(main())
+    assert started[:4] == [0, 1, 2, "interactive"]
+    assert sorted(started[4:]) == [3, 4]
+
+
+def test_guild_limit_lets_other_guilds_through():
+    async def main():
+        scheduler = RequestScheduler(concurrency=4, reserved=1, guild_limit=2)
+        blocked = asyncio.Event()
+        started = []
+
+        async def request(guild):
+            started.append(guild)
+            await blocked.wait()
+
+        tasks = [
+            asyncio.create_task(
+                scheduler.run(lambda g=guild: request(g), guild, Priority.BACKGROUND)
+            )
+            for guild in [1, 1, 1, 1, 2]
+        ]
+        await asyncio.sleep(0)
+        running = list(started)
+
+        blocked.set()
+        await asyncio.gather(*tasks)
+        return running, scheduler
+
+    running, scheduler = asyncio.run(main())
+    assert running == [1, 1, 2]
+    assert scheduler.depth() == 0
+    assert scheduler._running == 0
+
+
+def test_guilds_run_background_work_at_the_same_time():
+    async def main():
+        scheduler = RequestScheduler(guild_limit=2, active_guilds=3)
+        blocked = asyncio.Event()
+        started = []
+
+        async def request(guild):
+            started.append(guild)
+            await blocked.wait()
+
+        # Bulk re-rendering, rate limited and closing matches in three guilds
+        tasks = [
+            asyncio.create_task(scheduler.run(lambda g=guild: request(g), guild, p))
+            for guild, p in [(1, Priority.BULK), (2, Priority.BACKGROUND)] * 3
+            + [(3, Priority.BACKGROUND)] * 3
+        ]
+        await asyncio.sleep(0)
+        running = sorted(started)
+        interactive = await asyncio.wait_for(
+            scheduler.run(lambda: asyncio.sleep(0, "done"), 1, Priority.INTERACTIVE), 1
+        )
+
+        blocked.set()
+        await asyncio.gather(*tasks)
+        return running, interactive, scheduler
+
+    running, interactive, scheduler = asyncio.run(main())
+    assert scheduler.concurrency == 2 * 3 + 2
+    assert running == [1, 1, 2, 2, 3, 3]
+    assert interactive == "done"
+    assert scheduler._running == 0
+
+
+def test_cancelled_request_frees_its_turn():
+    async def main():
+        scheduler = RequestScheduler(concurrency=1, reserved=0)
+        blocked = asyncio.Event()
+
+        first = asyncio.create_task(scheduler.run(blocked.wait, 1))
+        second = asyncio.create_task(scheduler.run(blocked.wait, 1))
+        await asyncio.sleep(0)
+        second.cancel()
+        blocked.set()
+        await first
+        result = await asyncio.wait_for(scheduler.run(lambda: asyncio.sleep(0, 3)), 1)
+        return result, scheduler._running
+
+    assert asyncio.run(main()) == (3, 0)
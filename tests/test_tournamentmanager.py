@@ -0,0 +1,251 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Iterator
+
+import discord
+import pytest
+
+from src import models
+from src.managers.tournamentmanager import TournamentManager
+
+USERS = 6
+MATCHES = 3
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+        self.guild = SimpleNamespace(id=1)
+        self.mention = f"<#{channel_id}>"
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+
+    def get_partial_message(self, message_id: int):
+        async def edit(**fields):
+            return SimpleNamespace(id=message_id, **fields)
+
+        return SimpleNamespace(id=message_id, edit=edit)
+
+
+class FakeEmoji:
+    def __init__(self, emoji_id: int):
+        self.id = emoji_id
+        self.url = f"https://cdn.discordapp.com/emojis/{emoji_id}.png"
+
+    def __str__(self):
+        return f"<:e:{self.id}>"
+
+
+class FakeClient:
+    def __init__(self):
+        self.channels = {}
+
+    def get_channel(self, channel_id: int):
+        return self.channels.setdefault(channel_id, FakeChannel(channel_id))
+
+    def get_emoji(self, emoji_id: int):
+        return FakeEmoji(emoji_id)
+
+
+async def create_fandom_tab() -> list[models.Match]:
+    tournament = await models.Tournament.create(
+        name="Worlds", guild=1, channel=2, message=3, updates_channel=4, running=1
+    )
+    team1 = await models.Team.create(name="G2", code="G2", emoji=11, guild=1)
+    team2 = await models.Team.create(name="FNC", code="FNC", emoji=22, guild=1)
+    await models.EmojiColour.create(emoji=11, colour=0xABCDEF)
+
+    matches = []
+    for i in range(1, MATCHES + 1):
+        matches.append(
+            await models.Match.create(
+                name=f"Match {i}",
+                tournament=tournament,
+                team1=team1,
+                team2=team2,
+                bestof=3,
+                id_in_tournament=i,
+                message=100 + i,
+                running=models.MatchRunningEnum.CLOSED,
+                fandom_tab="Week 1",
+                fandom_initialn_matchintab=i,
+            )
+        )
+
+    for i in range(USERS):
+        user = await models.User.create(discord_id=1000 + i, name=f"user{i}")
+        for match in matches:
+            await models.Prediction.create(
+                user=user, match=match, team=1 + i % 2, games=2 + i % 2
+            )
+    return matches
+
+
+@pytest.fixture
+def client() -> FakeClient:
+    return FakeClient()
+
+
+@pytest.fixture
+def manager(client: FakeClient) -> Iterator[TournamentManager]:
+    manager = TournamentManager(client)
+    yield manager
+    manager.cancel_jobs()
+    manager.reaction_queue.cancel()
+    manager.tournament_messages.cancel()
+    manager.emoji_colours.close()
+
+
+def test_end_match_query_count(run, queries, manager, client):
+    async def main():
+        matches = await create_fandom_tab()
+
+        counts = []
+        for match in matches:
+            match = await models.Match.get(id=match.id)
+            queries.clear()
+            await manager.end_match(match, 1, 2)
+            counts.append(len(queries))
+
+        return counts, client.channels[4].sent
+
+    counts, sent = run(main)
+
+    # Every call: tournament, predictions, match update, guild score upsert,
+    # teams for the match message and the open matches left in the tab (6).
+    # The first call builds the score index (2) and reads the winner's emoji
+    # colour (1), the last reads the tab leaderboard (2).
+    assert counts == [6 + 2 + 1, 6, 6 + 2]
+
+    embeds = [kwargs["embed"] for content, kwargs in sent if "embed" in kwargs]
+    assert len(embeds) == MATCHES
+    assert {embed.colour.value for embed in embeds} == {0xABCDEF}
+    # Users with an even number picked team 1 with 2 games, 3 points a match
+    fields = embeds[-1].to_dict()["fields"]
+    assert [(f["name"], f["value"]) for f in fields[1:4]] == [
+        ("user0", "9 points"),
+        ("user2", "9 points"),
+        ("user4", "9 points"),
+    ]
+    assert sent[-1][0].startswith("**Worlds Leaderboard - Week 1**")
+
+
+def test_end_match_scores_without_index_entry(run, manager, client):
+    async def main():
+        matches = await create_fandom_tab()
+
+        # An index that doesn't hold the match, e.g. built from an outdated leaderboard
+        tournament = await matches[0].tournament
+        await manager.get_score_index(tournament)
+        manager.update_score_index = lambda match, scores, was_ended: None
+
+        match = await models.Match.get(id=matches[0].id)
+        await manager.end_match(match, 1, 2)
+
+        return client.channels[4].sent
+
+    sent = run(main)
+    fields = sent[0][1]["embed"].to_dict()["fields"]
+    assert (fields[1]["name"], fields[1]["value"]) == ("user0", "3 points")
+
+
+def test_end_match_with_deleted_emoji(run, manager, client):
+    async def main():
+        matches = await create_fandom_tab()
+        # The winning team's emoji was deleted
+        client.get_emoji = lambda emoji_id: None
+
+        match = await models.Match.get(id=matches[0].id)
+        await manager.end_match(match, 1, 2)
+
+        return client.channels[4].sent
+
+    sent = run(main)
+    embed = sent[0][1]["embed"].to_dict()
+    assert embed["color"] == discord.Colour.blurple().value
+    assert "thumbnail" not in embed
+
+
+def test_concurrent_end_match_guild_scores(run, manager):
+    async def main():
+        matches = await create_fandom_tab()
+
+        matches = [await models.Match.get(id=m.id) for m in matches]
+        await asyncio.gather(*[manager.end_match(m, 1, 2) for m in matches])
+
+        return await models.GuildScore.all().values_list(
+            "user__name", "score", "correct", "total"
+        )
+
+    rows = sorted(run(main))
+    assert len(rows) == USERS
+    assert rows[0] == ("user0", 9, 3, 3)
+    assert rows[1] == ("user1", 0, 0, 3)
+
+
+def test_reending_match_without_end_time_skips_guild_scores(run, manager):
+    async def main():
+        matches = await create_fandom_tab()
+
+        # Ended before the guild scores existed
+        await models.Match.filter(id=matches[0].id).update(
+            running=models.MatchRunningEnum.ENDED, result=2, games=3
+        )
+        match = await models.Match.get(id=matches[0].id)
+        await manager.end_match(match, 1, 2)
+
+        return await models.GuildScore.all().count()
+
+    assert run(main) == 0
+
+
+def test_reending_match_without_end_time_after_rebuild(run, manager):
+    async def main():
+        matches = await create_fandom_tab()
+
+        # Ended before the guild scores existed, then the board was rebuilt
+        await models.Match.filter(id=matches[0].id).update(
+            running=models.MatchRunningEnum.ENDED, result=2, games=3
+        )
+        await manager.rebuild_guild_scores(1)
+        match = await models.Match.get(id=matches[0].id)
+        await manager.end_match(match, 1, 2)
+
+        fields = ("user__name", "day", "score", "correct", "total")
+        updated = await models.GuildScore.all().values_list(*fields)
+        await manager.rebuild_guild_scores(1)
+        rebuilt = await models.GuildScore.all().values_list(*fields)
+        return updated, rebuilt
+
+    updated, rebuilt = run(main)
+    assert sorted(updated) == sorted(rebuilt)
+    assert ("user0", None, 3, 1, 1) in updated
+
+
+def test_rerender_matches_reports_failure(run, manager):
+    async def main():
+        matches = await create_fandom_tab()
+        edits = []
+
+        async def edit(channel_id, message_id, priority=None, **fields):
+            edits.append((message_id, fields["content"]))
+
+        async def generate_match_texts(matches):
+            raise RuntimeError("Could not render")
+
+        manager.messages.edit = edit
+        manager.generate_match_texts = generate_match_texts
+        progress = SimpleNamespace(id=50, channel=SimpleNamespace(id=2))
+        await manager.rerender_matches(matches, progress)
+
+        return edits
+
+    edits = run(main)
+    assert edits == [
+        (
+            50,
+            f"Could not update the match messages, an error occured after updating 0/{MATCHES}.",
+        )
+    ]